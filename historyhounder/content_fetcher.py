@@ -9,18 +9,28 @@ import shlex
 
 YOUTUBE_REGEX = re.compile(r'(https?://)?(www\.)?(youtube\.com|youtu\.be)/')
 
+# URLs longer than this are rejected before any parsing
+MAX_URL_LENGTH = 2048
+
+# Shell metacharacters that could be used for command injection, as one character class
+SHELL_METACHAR_REGEX = re.compile(r'[;&|`$(){}\[\]<>"\'\\]')
+
+HTTP_SCHEME_REGEX = re.compile(r'^https?://', re.IGNORECASE)
+
 
 def validate_url(url):
     """
     Validate and sanitize URL to prevent command injection.
     Returns True if URL is safe, False otherwise.
     """
-    if not url or not isinstance(url, str):
+    if not url or not isinstance(url, str) or len(url) > MAX_URL_LENGTH:
+        return False
+    
+    # Cheap scheme check rejects most non-URLs before the character scan
+    if not HTTP_SCHEME_REGEX.match(url):
         return False
     
-    # Check for shell metacharacters that could be used for command injection
-    dangerous_chars = [';', '&', '|', '`', '$', '(', ')', '{', '}', '[', ']', '<', '>', '"', "'", '\\']
-    if any(char in url for char in dangerous_chars):
+    if SHELL_METACHAR_REGEX.search(url):
         return False
     
     # Validate URL format
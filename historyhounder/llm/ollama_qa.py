@@ -1,8 +1,10 @@
 from typing import List, Dict, Literal, Optional
 from pydantic import BaseModel, Field, field_validator
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict
+from functools import lru_cache
+from urllib.parse import urlparse
 import re
 from dateutil import parser as date_parser
 from dateutil.relativedelta import relativedelta
@@ -47,153 +49,158 @@ class QAResponse(BaseModel):
         return v
 
 
+# Common temporal patterns, compiled once and tried in priority order
+TEMPORAL_PATTERNS = (
+    (re.compile(r'last (\w+)', re.IGNORECASE), 'last_day'),
+    (re.compile(r'yesterday', re.IGNORECASE), 'yesterday'),
+    (re.compile(r'today', re.IGNORECASE), 'today'),
+    (re.compile(r'this (\w+)', re.IGNORECASE), 'this_period'),
+    (re.compile(r'(\d+) days? ago', re.IGNORECASE), 'days_ago'),
+    (re.compile(r'(\d+) weeks? ago', re.IGNORECASE), 'weeks_ago'),
+    (re.compile(r'(\d+) months? ago', re.IGNORECASE), 'months_ago'),
+    (re.compile(r'(\d+) years? ago', re.IGNORECASE), 'years_ago')
+)
+
+WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+
+@lru_cache(maxsize=512)
+def _match_temporal_reference(question):
+    """
+    Find the first usable temporal reference in a question.
+    Returns (pattern_type, captured_value, filtered_question) or None. Dates are left to the caller
+    so the cached result never goes stale.
+    """
+    question_lower = question.lower()
+    
+    for pattern, pattern_type in TEMPORAL_PATTERNS:
+        match = pattern.search(question_lower)
+        if not match:
+            continue
+        value = match.group(1) if match.groups() else None
+        # 'last X' and 'this X' only count for weekdays and known periods
+        if pattern_type == 'last_day' and value not in WEEKDAYS:
+            continue
+        if pattern_type == 'this_period' and value not in ('week', 'month', 'year'):
+            continue
+        return pattern_type, value, pattern.sub('', question).strip()
+    
+    return None
+
+
 def parse_temporal_reference(question):
     """
     Parse temporal references from questions like 'last Friday', 'yesterday', 'this week'.
     Returns (filtered_question, start_date, end_date) or (question, None, None) if no temporal reference.
     """
-    question_lower = question.lower()
-    
-    # Common temporal patterns
-    temporal_patterns = {
-        r'last (\w+)': 'last_day',
-        r'yesterday': 'yesterday', 
-        r'today': 'today',
-        r'this (\w+)': 'this_period',
-        r'(\d+) days? ago': 'days_ago',
-        r'(\d+) weeks? ago': 'weeks_ago',
-        r'(\d+) months? ago': 'months_ago',
-        r'(\d+) years? ago': 'years_ago'
-    }
+    matched = _match_temporal_reference(question)
+    if matched is None:
+        return question, None, None
     
+    pattern_type, value, filtered_question = matched
     now = datetime.now()
-    filtered_question = question
+    # Day offsets are plain ordinal arithmetic; fromordinal gives midnight directly
+    today = now.toordinal()
     
-    for pattern, pattern_type in temporal_patterns.items():
-        match = re.search(pattern, question_lower)
-        if match:
-            if pattern_type == 'yesterday':
-                start_date = now - timedelta(days=1)
-                end_date = start_date.replace(hour=23, minute=59, second=59)
-                start_date = start_date.replace(hour=0, minute=0, second=0)
-                filtered_question = re.sub(pattern, '', filtered_question, flags=re.IGNORECASE).strip()
-                return filtered_question, start_date, end_date
-                
-            elif pattern_type == 'today':
-                start_date = now.replace(hour=0, minute=0, second=0)
-                end_date = now.replace(hour=23, minute=59, second=59)
-                filtered_question = re.sub(pattern, '', filtered_question, flags=re.IGNORECASE).strip()
-                return filtered_question, start_date, end_date
-                
-            elif pattern_type == 'last_day':
-                day_name = match.group(1).lower()
-                days_map = {
-                    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-                    'friday': 4, 'saturday': 5, 'sunday': 6
-                }
-                if day_name in days_map:
-                    target_weekday = days_map[day_name]
-                    current_weekday = now.weekday()
-                    days_back = (current_weekday - target_weekday + 7) % 7
-                    if days_back == 0:  # Same day, go back a week
-                        days_back = 7
-                    start_date = now - timedelta(days=days_back)
-                    start_date = start_date.replace(hour=0, minute=0, second=0)
-                    end_date = start_date.replace(hour=23, minute=59, second=59)
-                    filtered_question = re.sub(pattern, '', filtered_question, flags=re.IGNORECASE).strip()
-                    return filtered_question, start_date, end_date
-                    
-            elif pattern_type == 'this_period':
-                period = match.group(1).lower()
-                if period == 'week':
-                    # This week (Monday to Sunday)
-                    days_since_monday = now.weekday()
-                    start_date = now - timedelta(days=days_since_monday)
-                    start_date = start_date.replace(hour=0, minute=0, second=0)
-                    end_date = now
-                    filtered_question = re.sub(pattern, '', filtered_question, flags=re.IGNORECASE).strip()
-                    return filtered_question, start_date, end_date
-                elif period == 'month':
-                    start_date = now.replace(day=1, hour=0, minute=0, second=0)
-                    end_date = now
-                    filtered_question = re.sub(pattern, '', filtered_question, flags=re.IGNORECASE).strip()
-                    return filtered_question, start_date, end_date
-                elif period == 'year':
-                    start_date = now.replace(month=1, day=1, hour=0, minute=0, second=0)
-                    end_date = now
-                    filtered_question = re.sub(pattern, '', filtered_question, flags=re.IGNORECASE).strip()
-                    return filtered_question, start_date, end_date
-                    
-            elif pattern_type == 'days_ago':
-                days = int(match.group(1))
-                start_date = now - timedelta(days=days)
-                start_date = start_date.replace(hour=0, minute=0, second=0)
-                end_date = start_date.replace(hour=23, minute=59, second=59)
-                filtered_question = re.sub(pattern, '', filtered_question, flags=re.IGNORECASE).strip()
-                return filtered_question, start_date, end_date
-                
-            elif pattern_type == 'weeks_ago':
-                weeks = int(match.group(1))
-                start_date = now - timedelta(weeks=weeks)
-                start_date = start_date.replace(hour=0, minute=0, second=0)
-                end_date = start_date + timedelta(days=6)
-                end_date = end_date.replace(hour=23, minute=59, second=59)
-                filtered_question = re.sub(pattern, '', filtered_question, flags=re.IGNORECASE).strip()
-                return filtered_question, start_date, end_date
-                
-            elif pattern_type == 'months_ago':
-                months = int(match.group(1))
-                start_date = now - relativedelta(months=months)
-                start_date = start_date.replace(day=1, hour=0, minute=0, second=0)
-                # Last day of that month
-                end_date = start_date + relativedelta(months=1) - timedelta(days=1)
-                end_date = end_date.replace(hour=23, minute=59, second=59)
-                filtered_question = re.sub(pattern, '', filtered_question, flags=re.IGNORECASE).strip()
-                return filtered_question, start_date, end_date
-                
-            elif pattern_type == 'years_ago':
-                years = int(match.group(1))
-                start_date = now - relativedelta(years=years)
-                start_date = start_date.replace(month=1, day=1, hour=0, minute=0, second=0)
-                end_date = start_date.replace(month=12, day=31, hour=23, minute=59, second=59)
-                filtered_question = re.sub(pattern, '', filtered_question, flags=re.IGNORECASE).strip()
-                return filtered_question, start_date, end_date
+    if pattern_type == 'yesterday':
+        start_date = datetime.fromordinal(today - 1)
+        end_date = start_date.replace(hour=23, minute=59, second=59)
+        
+    elif pattern_type == 'today':
+        start_date = datetime.fromordinal(today)
+        end_date = start_date.replace(hour=23, minute=59, second=59)
+        
+    elif pattern_type == 'last_day':
+        days_back = (now.weekday() - WEEKDAYS[value]) % 7
+        if days_back == 0:  # Same day, go back a week
+            days_back = 7
+        start_date = datetime.fromordinal(today - days_back)
+        end_date = start_date.replace(hour=23, minute=59, second=59)
+        
+    elif pattern_type == 'this_period':
+        if value == 'week':
+            # This week (Monday to Sunday)
+            start_date = datetime.fromordinal(today - now.weekday())
+        elif value == 'month':
+            start_date = datetime(now.year, now.month, 1)
+        else:
+            start_date = datetime(now.year, 1, 1)
+        end_date = now
+        
+    elif pattern_type == 'days_ago':
+        start_date = datetime.fromordinal(today - int(value))
+        end_date = start_date.replace(hour=23, minute=59, second=59)
+        
+    elif pattern_type == 'weeks_ago':
+        start_ordinal = today - 7 * int(value)
+        start_date = datetime.fromordinal(start_ordinal)
+        end_date = datetime.fromordinal(start_ordinal + 6).replace(hour=23, minute=59, second=59)
+        
+    elif pattern_type == 'months_ago':
+        start_date = datetime(now.year, now.month, 1) - relativedelta(months=int(value))
+        # Last day of that month
+        end_date = datetime.fromordinal((start_date + relativedelta(months=1)).toordinal() - 1)
+        end_date = end_date.replace(hour=23, minute=59, second=59)
+        
+    else:  # years_ago
+        start_year = now.year - int(value)
+        start_date = datetime(start_year, 1, 1)
+        end_date = datetime(start_year, 12, 31, 23, 59, 59)
+    
+    return filtered_question, start_date, end_date
+
+
+def _normalize_date_bounds(start_date, end_date):
+    """Turn (start_date, end_date) into naive datetimes, with None bounds opened up to datetime.min/max."""
+    if start_date is None:
+        start_date = datetime.min
+    if end_date is None:
+        end_date = datetime.max
     
-    return question, None, None
+    # CRITICAL FIX: Ensure timezone consistency
+    # Make both dates naive for comparison (remove timezone info if present)
+    if start_date.tzinfo is not None:
+        start_date = start_date.replace(tzinfo=None)
+    if end_date.tzinfo is not None:
+        end_date = end_date.replace(tzinfo=None)
+    return start_date, end_date
+
+
+def _visit_in_range(meta, start_date, end_date):
+    """Check one metadata entry against normalized bounds; entries without a parseable visit time count as in range."""
+    visit_time_str = meta.get('visit_time', '')
+    if not visit_time_str:
+        # If no visit time, include the entry
+        return True
+    try:
+        # Parse visit time - the pipeline stores ISO strings, which parse in C;
+        # fall back to dateutil for other formats
+        try:
+            visit_time = datetime.fromisoformat(visit_time_str)
+        except ValueError:
+            visit_time = date_parser.parse(visit_time_str)
+        
+        if visit_time.tzinfo is not None:
+            visit_time = visit_time.replace(tzinfo=None)
+        
+        return start_date <= visit_time <= end_date
+    except (ValueError, TypeError):
+        # If we can't parse the date, include the entry
+        return True
 
 
 def filter_by_date_range(metadatas, start_date, end_date):
     """
     Filter metadata entries by date range.
-    Returns list of metadata entries within the specified date range.
+    Returns list of metadata entries within the specified date range. A None bound leaves that side open.
     """
-    filtered = []
-    for meta in metadatas:
-        visit_time_str = meta.get('visit_time', '')
-        if visit_time_str:
-            try:
-                # Parse visit time - handle different formats
-                visit_time = date_parser.parse(visit_time_str)
-                
-                # CRITICAL FIX: Ensure timezone consistency
-                # Make both dates naive for comparison (remove timezone info if present)
-                if visit_time.tzinfo is not None:
-                    visit_time = visit_time.replace(tzinfo=None)
-                if start_date.tzinfo is not None:
-                    start_date = start_date.replace(tzinfo=None)
-                if end_date.tzinfo is not None:
-                    end_date = end_date.replace(tzinfo=None)
-                
-                if start_date <= visit_time <= end_date:
-                    filtered.append(meta)
-            except (ValueError, TypeError):
-                # If we can't parse the date, include the entry
-                filtered.append(meta)
-        else:
-            # If no visit time, include the entry
-            filtered.append(meta)
-    
-    return filtered
+    if start_date is None and end_date is None:
+        return list(metadatas)
+    start_date, end_date = _normalize_date_bounds(start_date, end_date)
+    return [meta for meta in metadatas if _visit_in_range(meta, start_date, end_date)]
 
 
 def enhance_context_for_qa(documents, metadatas, temporal_filter=None):
@@ -216,20 +223,10 @@ def enhance_context_for_qa(documents, metadatas, temporal_filter=None):
             'metadatas': metadatas
         }
     
-    # Apply temporal filtering if provided
-    if temporal_filter:
-        start_date, end_date = temporal_filter
-        filtered_metadatas = filter_by_date_range(metadatas, start_date, end_date)
-        # Get corresponding documents
-        filtered_documents = []
-        for meta in filtered_metadatas:
-            try:
-                idx = metadatas.index(meta)
-                filtered_documents.append(documents[idx])
-            except ValueError:
-                continue
-        documents = filtered_documents
-        metadatas = filtered_metadatas
+    # Temporal filtering happens inside the aggregation loop, so the data is walked once
+    date_bounds = _normalize_date_bounds(*temporal_filter) if temporal_filter else None
+    filtered_documents = []
+    filtered_metadatas = []
     
     # Aggregate statistics
     total_visits = 0
@@ -241,13 +238,18 @@ def enhance_context_for_qa(documents, metadatas, temporal_filter=None):
     })
     
     for doc, meta in zip(documents, metadatas):
+        if date_bounds:
+            if not _visit_in_range(meta, *date_bounds):
+                continue
+            filtered_documents.append(doc)
+            filtered_metadatas.append(meta)
+        
         # Extract domain from URL if not in metadata
         domain = meta.get('domain', '')
         if not domain:
             url = meta.get('url', '')
             if url:
                 try:
-                    from urllib.parse import urlparse
                     parsed_url = urlparse(url)
                     domain = parsed_url.netloc
                 except:
@@ -267,6 +269,10 @@ def enhance_context_for_qa(documents, metadatas, temporal_filter=None):
         if visit_time:
             domain_stats[domain]['visit_times'].append(visit_time)
     
+    if date_bounds:
+        documents = filtered_documents
+        metadatas = filtered_metadatas
+    
     # Sort domains by visit count
     top_domains = sorted(domain_stats.items(), key=lambda x: x[1]['total_visits'], reverse=True)
     most_visited_domain = top_domains[0][0] if top_domains else None
@@ -1,7 +1,7 @@
 from historyhounder import history_extractor, content_fetcher
 from historyhounder.embedder import get_embedder
 from historyhounder.vector_store import ChromaVectorStore
-from historyhounder.utils import should_ignore, convert_metadata_for_chroma
+from historyhounder.utils import should_ignore
 
 
 def extract_and_process_history(
@@ -113,7 +113,8 @@ def extract_and_process_history(
                 else:
                     metadata['domain'] = 'unknown'
             
-            metadatas.append(convert_metadata_for_chroma(metadata))
+            # ChromaVectorStore.add converts values to Chroma-compatible types
+            metadatas.append(metadata)
         
         store = ChromaVectorStore(persist_directory=persist_directory)
         store.add(docs, embeddings, metadatas)
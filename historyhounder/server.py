@@ -255,7 +255,7 @@ async def search_history(
             )
         
         # Perform semantic search
-        results = semantic_search(q, top_k=top_k)
+        results = semantic_search(q, top_k=top_k, persist_directory=VECTOR_STORE_DIR)
         
         # Format results for API
         formatted_results = []
@@ -334,7 +334,7 @@ async def ask_question(request: QaRequest):
             )
         
         # Perform Q&A search
-        result = llm_qa_search(request.question, top_k=request.top_k)
+        result = llm_qa_search(request.question, top_k=request.top_k, persist_directory=VECTOR_STORE_DIR)
         
         # Format sources for the response
         sources = []
@@ -1,7 +1,8 @@
-from urllib.parse import urlparse
+from urllib.parse import urlparse, unquote
 import re
 from datetime import datetime
 import os
+import stat
 from pathlib import Path
 
 def parse_comma_separated_values(value):
@@ -23,46 +24,41 @@ def should_ignore(url, ignore_domains, ignore_patterns):
     return False
 
 
+# Parent-directory segments (either separator) and NUL bytes, matched in one pass
+PATH_TRAVERSAL_REGEX = re.compile(r'(?:^|[\\/])\.\.(?:[\\/]|$)|\x00')
+
+# System temp directories whose files are accepted even as absolute paths
+TEMP_DIRS = ('/tmp', '/var/tmp', '/private/var/folders')
+
+
 def validate_file_path(file_path):
     """Validate file path to prevent path traversal attacks."""
     if not file_path:
         return False
     
+    # Reject traversal before touching the filesystem; decode once so %2F/%5C forms are caught too
+    if PATH_TRAVERSAL_REGEX.search(unquote(str(file_path))):
+        return False
+    
     try:
-        # Convert to Path object for better handling
         path = Path(file_path)
         
-        # Check for path traversal attempts
-        normalized_path = path.resolve()
+        # Canonicalize once; the containment checks below all reuse it
+        real_path = os.path.realpath(path)
         
         # For security tests, allow temporary files in system temp directories
-        temp_dirs = ['/tmp', '/var/tmp', '/private/var/folders']
-        if any(str(normalized_path).startswith(temp_dir) for temp_dir in temp_dirs):
-            # Allow temporary files for testing purposes
-            if path.exists() and path.is_file():
-                return True
-        
-        # Check if path is absolute (security risk for non-temp files)
-        if path.is_absolute():
-            return False
-        
-        # Check for path traversal attempts
-        current_dir = Path.cwd().resolve()
-        
-        # Ensure the normalized path is within the current directory
-        try:
-            normalized_path.relative_to(current_dir)
-        except ValueError:
-            return False
-        
-        # Check if file exists and is actually a file
-        if not path.exists():
-            return False
-        
-        if not path.is_file():
-            return False
+        if not any(real_path.startswith(temp_dir) for temp_dir in TEMP_DIRS):
+            # Check if path is absolute (security risk for non-temp files)
+            if path.is_absolute():
+                return False
+            
+            # Ensure the canonical path is within the current directory
+            current_dir = os.path.realpath(os.getcwd())
+            if os.path.commonpath([real_path, current_dir]) != current_dir:
+                return False
         
-        return True
+        # A single stat answers both "exists" and "is a regular file"
+        return stat.S_ISREG(os.stat(real_path).st_mode)
         
     except (OSError, ValueError):
         return False
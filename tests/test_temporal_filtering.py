@@ -1,95 +1,132 @@
 import pytest
-import tempfile
 from datetime import datetime, timedelta
 from historyhounder.llm.ollama_qa import parse_temporal_reference, filter_by_date_range, enhance_context_for_qa
 from historyhounder.search import llm_qa_search
 from historyhounder.vector_store import ChromaVectorStore
-from historyhounder.embedder import get_embedder
+from tests._embed_cache import embed_cached
+
+
+# Page texts for the temporal sample data; only their visit times depend on the clock
+SAMPLE_DOCUMENTS: tuple[str, ...] = (
+    "GitHub is a web-based platform for version control and collaboration.",
+    "LinkedIn is a professional networking platform for business professionals.",
+    "Stack Overflow is a question and answer site for programmers.",
+    "YouTube is a video sharing platform owned by Google.",
+    "Google is a multinational technology company specializing in internet services."
+)
+
+# Temporal phrases with the pattern type parse_temporal_reference should match
+TEMPORAL_CASES: tuple[tuple[str, str], ...] = (
+    ("last monday", "last_day"),
+    ("last tuesday", "last_day"),
+    ("last wednesday", "last_day"),
+    ("last thursday", "last_day"),
+    ("last friday", "last_day"),
+    ("last saturday", "last_day"),
+    ("last sunday", "last_day"),
+    ("yesterday", "yesterday"),
+    ("today", "today"),
+    ("this week", "this_period"),
+    ("this month", "this_period"),
+    ("this year", "this_period"),
+    ("2 days ago", "days_ago"),
+    ("1 week ago", "weeks_ago"),
+    ("3 months ago", "months_ago"),
+    ("1 year ago", "years_ago")
+)
+
+
+@pytest.fixture(scope="module")
+def last_friday_midnight():
+    """Start of last Friday, going back a full week on Fridays, the same way parse_temporal_reference does."""
+    now = datetime.now()
+    days_back = (now.weekday() - 4) % 7 or 7
+    return (now - timedelta(days=days_back)).replace(hour=0, minute=0, second=0, microsecond=0)
 
 
 class TestTemporalFiltering:
     """Test temporal filtering functionality."""
     
-    @pytest.fixture
-    def temp_vector_store_dir(self):
-        """Create a temporary directory for vector store."""
-        temp_dir = tempfile.mkdtemp(prefix="test_temporal_")
-        yield temp_dir
-        # Clean up after test
-        try:
-            import shutil
-            shutil.rmtree(temp_dir)
-        except Exception:
-            pass
+    @pytest.fixture(scope="class")
+    def temp_vector_store_dir(self, tmp_path_factory):
+        """Temporary directory for the vector store, shared by the class."""
+        return str(tmp_path_factory.mktemp("test_temporal_"))
+    
+    @pytest.fixture(scope="class")
+    def vector_store(self, temp_vector_store_dir):
+        """One ChromaVectorStore for the class; tests clear it before adding their data."""
+        store = ChromaVectorStore(persist_directory=temp_vector_store_dir)
+        yield store
+        store.close()
+    
+    @pytest.fixture(scope="class")
+    def shared_embedder(self, warm_embedder):
+        """Session-wide embedder for the integration tests; fails them up front if the model could not load."""
+        if warm_embedder is None:
+            pytest.fail("sentence-transformers model could not be loaded")
+        return warm_embedder
+    
+    @pytest.fixture(scope="class")
+    def sample_embeddings(self, embedding_cache_dir, shared_embedder):
+        """Embeddings of SAMPLE_DOCUMENTS, computed once and cached between runs."""
+        return embed_cached(shared_embedder, list(SAMPLE_DOCUMENTS), embedding_cache_dir)
     
     @pytest.fixture
-    def sample_data_with_dates(self):
-        """Create sample data with different dates for temporal testing."""
-        documents = [
-            "GitHub is a web-based platform for version control and collaboration.",
-            "LinkedIn is a professional networking platform for business professionals.",
-            "Stack Overflow is a question and answer site for programmers.",
-            "YouTube is a video sharing platform owned by Google.",
-            "Google is a multinational technology company specializing in internet services."
-        ]
-        
+    def sample_metadatas(self, last_friday_midnight):
+        """Create sample metadata with different dates for temporal testing."""
         # Create dates for different time periods
         now = datetime.now()
         yesterday = now - timedelta(days=1)
         
-        # Calculate last Friday using the same logic as the function
-        target_day = 4  # Friday
-        current_day = now.weekday()
-        days_back = (current_day - target_day) % 7
-        if days_back == 0:
-            days_back = 7  # Last week's day
-        last_friday = now - timedelta(days=days_back)
-        last_friday = last_friday.replace(hour=12, minute=0, second=0, microsecond=0)  # Midday
+        last_friday = last_friday_midnight.replace(hour=12)  # Midday
         
         last_week = now - timedelta(days=7)
         last_month = now - timedelta(days=30)
         
-        metadatas = [
+        return [
             {
                 'url': 'https://github.com',
                 'title': 'GitHub - Where the world builds software',
                 'domain': 'github.com',
                 'visit_count': 25,
-                'visit_time': now.strftime('%Y-%m-%dT%H:%M:%S')
+                'visit_time': now.isoformat(timespec='seconds')
             },
             {
                 'url': 'https://linkedin.com',
                 'title': 'LinkedIn: Log In or Sign Up',
                 'domain': 'linkedin.com',
                 'visit_count': 15,
-                'visit_time': yesterday.strftime('%Y-%m-%dT%H:%M:%S')
+                'visit_time': yesterday.isoformat(timespec='seconds')
             },
             {
                 'url': 'https://stackoverflow.com',
                 'title': 'Stack Overflow - Where Developers Learn, Share, & Build Careers',
                 'domain': 'stackoverflow.com',
                 'visit_count': 10,
-                'visit_time': last_friday.strftime('%Y-%m-%dT%H:%M:%S')
+                'visit_time': last_friday.isoformat(timespec='seconds')
             },
             {
                 'url': 'https://youtube.com',
                 'title': 'YouTube',
                 'domain': 'youtube.com',
                 'visit_count': 8,
-                'visit_time': last_week.strftime('%Y-%m-%dT%H:%M:%S')
+                'visit_time': last_week.isoformat(timespec='seconds')
             },
             {
                 'url': 'https://google.com',
                 'title': 'Google',
                 'domain': 'google.com',
                 'visit_count': 12,
-                'visit_time': last_month.strftime('%Y-%m-%dT%H:%M:%S')
+                'visit_time': last_month.isoformat(timespec='seconds')
             }
         ]
-        
-        return documents, metadatas
     
-    def test_parse_temporal_reference_last_friday(self):
+    @pytest.fixture
+    def sample_data_with_dates(self, sample_metadatas):
+        """Pair SAMPLE_DOCUMENTS with the dated sample metadata."""
+        return list(SAMPLE_DOCUMENTS), sample_metadatas
+    
+    def test_parse_temporal_reference_last_friday(self, last_friday_midnight):
         """Test parsing 'last Friday' temporal reference."""
         question = "What is my most visited website last Friday?"
         filtered_query, start_date, end_date = parse_temporal_reference(question)
@@ -100,17 +137,9 @@ class TestTemporalFiltering:
         assert "last friday" not in filtered_query.lower()
         assert "most visited website" in filtered_query.lower()
 
-        # Verify it's actually last Friday using the same logic as the function
-        now = datetime.now()
-        target_day = 4  # Friday
-        current_day = now.weekday()
-        days_back = (current_day - target_day + 7) % 7
-        if days_back == 0:
-            days_back = 7  # Last week's day
-        expected_friday = now - timedelta(days=days_back)
-
-        assert start_date.date() == expected_friday.date()
-        assert end_date.date() == expected_friday.date()
+        # Verify it's actually last Friday
+        assert start_date.date() == last_friday_midnight.date()
+        assert end_date.date() == last_friday_midnight.date()
         # Verify time boundaries
         assert start_date.hour == 0 and start_date.minute == 0 and start_date.second == 0
         assert end_date.hour == 23 and end_date.minute == 59 and end_date.second == 59
@@ -192,21 +221,12 @@ class TestTemporalFiltering:
         
         print("✅ No temporal reference parsed correctly")
     
-    def test_filter_by_date_range(self, sample_data_with_dates):
+    def test_filter_by_date_range(self, sample_metadatas, last_friday_midnight):
         """Test filtering metadata by date range."""
-        documents, metadatas = sample_data_with_dates
+        metadatas = sample_metadatas
         
-        # Test filtering for last Friday using the same logic as the function
-        now = datetime.now()
-        target_day = 4  # Friday
-        current_day = now.weekday()
-        days_back = (current_day - target_day) % 7
-        if days_back == 0:
-            days_back = 7  # Last week's day
-        last_friday = now - timedelta(days=days_back)
-        last_friday = last_friday.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        start_date = last_friday
+        # Test filtering for last Friday
+        start_date = last_friday_midnight
         end_date = start_date + timedelta(days=1)
         
         filtered_metadatas = filter_by_date_range(metadatas, start_date, end_date)
@@ -218,21 +238,12 @@ class TestTemporalFiltering:
         
         print(f"✅ Filtered for last Friday: {len(filtered_metadatas)} entries")
     
-    def test_enhanced_context_with_temporal_filtering(self, sample_data_with_dates):
+    def test_enhanced_context_with_temporal_filtering(self, sample_data_with_dates, last_friday_midnight):
         """Test enhanced context with temporal filtering."""
         documents, metadatas = sample_data_with_dates
         
-        # Test with temporal filter for last Friday using the same logic as the function
-        now = datetime.now()
-        target_day = 4  # Friday
-        current_day = now.weekday()
-        days_back = (current_day - target_day) % 7
-        if days_back == 0:
-            days_back = 7  # Last week's day
-        last_friday = now - timedelta(days=days_back)
-        last_friday = last_friday.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        temporal_filter = (last_friday, last_friday + timedelta(days=1))
+        # Test with temporal filter for last Friday
+        temporal_filter = (last_friday_midnight, last_friday_midnight + timedelta(days=1))
         
         enhanced_context = enhance_context_for_qa(documents, metadatas, temporal_filter)
         
@@ -247,15 +258,13 @@ class TestTemporalFiltering:
         
         print(f"✅ Enhanced context with temporal filtering: {summary['total_visits']} visits")
     
-    def test_temporal_qa_integration(self, temp_vector_store_dir, sample_data_with_dates):
+    def test_temporal_qa_integration(self, temp_vector_store_dir, vector_store, sample_embeddings, sample_data_with_dates):
         """Test full Q&A integration with temporal filtering."""
         documents, metadatas = sample_data_with_dates
         
         # Setup vector store
-        store = ChromaVectorStore(persist_directory=temp_vector_store_dir)
-        embedder = get_embedder('sentence-transformers')
-        embeddings = embedder.embed(documents)
-        store.add(documents, embeddings, metadatas)
+        vector_store.clear()
+        vector_store.add(documents, sample_embeddings, metadatas)
         
         # Test temporal questions
         temporal_questions = [
@@ -319,18 +328,14 @@ class TestTemporalFiltering:
                 
             except Exception as e:
                 pytest.fail(f"Failed to process temporal question '{question}': {e}")
-        
-        store.close()
     
-    def test_most_visited_yesterday_specific(self, temp_vector_store_dir, sample_data_with_dates):
+    def test_most_visited_yesterday_specific(self, temp_vector_store_dir, vector_store, sample_embeddings, sample_data_with_dates):
         """Test the specific user question: 'Most visited site yesterday'."""
         documents, metadatas = sample_data_with_dates
         
         # Setup vector store
-        store = ChromaVectorStore(persist_directory=temp_vector_store_dir)
-        embedder = get_embedder('sentence-transformers')
-        embeddings = embedder.embed(documents)
-        store.add(documents, embeddings, metadatas)
+        vector_store.clear()
+        vector_store.add(documents, sample_embeddings, metadatas)
         
         # Test the exact user question
         question = "Most visited site yesterday"
@@ -393,8 +398,6 @@ class TestTemporalFiltering:
             assert summary['unique_domains'] == 1, f"Expected 1 domain (only LinkedIn yesterday), got {summary['unique_domains']}"
         else:
             print(f"⚠️ No temporal period found - filtering may not be working")
-        
-        store.close()
     
     def test_temporal_filtering_edge_cases(self):
         """Test edge cases in temporal filtering."""
@@ -409,48 +412,36 @@ class TestTemporalFiltering:
         filtered = filter_by_date_range(metadatas, datetime.now(), datetime.now() + timedelta(days=1))
         assert len(filtered) == 3  # Should include all (better to include than exclude)
         
+        # Open bounds: None on either side leaves that side unbounded
+        dated = [
+            {'visit_time': '2024-01-01T12:00:00', 'visit_count': 1},
+            {'visit_time': '2024-06-01T12:00:00', 'visit_count': 2},
+        ]
+        assert filter_by_date_range(dated, None, None) == dated
+        assert filter_by_date_range(dated, datetime(2024, 3, 1), None) == dated[1:]
+        assert filter_by_date_range(dated, None, datetime(2024, 3, 1)) == dated[:1]
+        
         print("✅ Edge cases handled gracefully")
     
-    def test_temporal_patterns_comprehensive(self):
+    @pytest.mark.parametrize("question, expected_type", TEMPORAL_CASES)
+    def test_temporal_patterns_comprehensive(self, question, expected_type):
         """Test comprehensive temporal pattern matching."""
-        test_cases = [
-            ("last monday", "last_day"),
-            ("last tuesday", "last_day"),
-            ("last wednesday", "last_day"),
-            ("last thursday", "last_day"),
-            ("last friday", "last_day"),
-            ("last saturday", "last_day"),
-            ("last sunday", "last_day"),
-            ("yesterday", "yesterday"),
-            ("today", "today"),
-            ("this week", "this_period"),
-            ("this month", "this_period"),
-            ("this year", "this_period"),
-            ("2 days ago", "days_ago"),
-            ("1 week ago", "weeks_ago"),
-            ("3 months ago", "months_ago"),
-            ("1 year ago", "years_ago"),
-        ]
+        filtered_query, start_date, end_date = parse_temporal_reference(question)
         
-        for question, expected_type in test_cases:
-            filtered_query, start_date, end_date = parse_temporal_reference(question)
-            
-            # Verify temporal reference was parsed
-            assert start_date is not None
-            assert end_date is not None
-            assert start_date < end_date
-            
-            print(f"✅ Pattern '{question}' -> {expected_type}: {start_date.date()} to {end_date.date()}")
+        # Verify temporal reference was parsed
+        assert start_date is not None
+        assert end_date is not None
+        assert start_date < end_date
+        
+        print(f"✅ Pattern '{question}' -> {expected_type}: {start_date.date()} to {end_date.date()}")
     
-    def test_temporal_context_in_prompt(self, temp_vector_store_dir, sample_data_with_dates):
+    def test_temporal_context_in_prompt(self, temp_vector_store_dir, vector_store, sample_embeddings, sample_data_with_dates):
         """Test that temporal context is properly included in the prompt."""
         documents, metadatas = sample_data_with_dates
         
         # Setup vector store
-        store = ChromaVectorStore(persist_directory=temp_vector_store_dir)
-        embedder = get_embedder('sentence-transformers')
-        embeddings = embedder.embed(documents)
-        store.add(documents, embeddings, metadatas)
+        vector_store.clear()
+        vector_store.add(documents, sample_embeddings, metadatas)
         
         # Test a temporal question
         question = "What is my most visited website last Friday?"
@@ -472,6 +463,4 @@ class TestTemporalFiltering:
         has_temporal_mention = any(mention in answer for mention in temporal_mentions)
         
         print(f"✅ Answer has temporal mention: {has_temporal_mention}")
-        print(f"   Answer: {result['answer'][:150]}...")
-        
-        store.close() 
\ No newline at end of file
+        print(f"   Answer: {result['answer'][:150]}...")
\ No newline at end of file
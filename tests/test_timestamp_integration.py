@@ -7,26 +7,47 @@ Covers the timestamp issues we encountered in the system.
 import pytest
 import tempfile
 import os
+import re
 import sqlite3
-import shutil
 from datetime import datetime
 from unittest.mock import patch
 
-from historyhounder.server import app
 from historyhounder.vector_store import ChromaVectorStore
 from historyhounder.pipeline import extract_and_process_history
 from historyhounder.history_extractor import chrome_time_to_datetime
 
 
+# Search results show visit times as "YYYY-MM-DD HH:MM:SS"
+_DISPLAY_TIME_RE = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
+
+# Microseconds from the Chrome epoch (1601-01-01) to the Unix epoch
+CHROME_EPOCH_OFFSET_US = 11_644_473_600_000_000
+
+
+def _populate_urls(db_path, rows):
+    """Insert (url, title, visit_count, typed_count, last_visit_time, hidden) rows into the urls table in one transaction."""
+    conn = sqlite3.connect(db_path)
+    # Throwaway test DB: skip journaling and fsync
+    conn.execute('PRAGMA journal_mode=MEMORY')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany('''
+        INSERT INTO urls (url, title, visit_count, typed_count, last_visit_time, hidden)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+class _StubEmbedder:
+    """Fixed-vector embedder for tests that only check metadata, so no model is loaded."""
+
+    def embed(self, texts):
+        return [[0.0] * 8 for _ in texts]
+
+
 class TestTimestampIntegration:
     """Integration tests for timestamp conversion and metadata handling."""
     
-    @pytest.fixture
-    def client(self):
-        """Create a test client for the FastAPI app."""
-        from fastapi.testclient import TestClient
-        return TestClient(app)
-    
     @pytest.fixture
     def isolated_client(self, monkeypatch, tmp_path_factory):
         """Create a test client with isolated database directories."""
@@ -47,45 +68,31 @@ class TestTimestampIntegration:
         from fastapi.testclient import TestClient
         return TestClient(server.app)
     
-    @pytest.fixture(autouse=True)
-    def cleanup_vector_store(self):
-        """Clean up the vector store before and after each test."""
-        # This fixture is no longer needed since tests use isolated temp directories
-        # Individual tests handle their own vector store cleanup
-        yield
-    
-    @pytest.fixture(autouse=True)
+    @pytest.fixture(scope="class", autouse=True)
     def cleanup_temp_files(self):
-        """Clean up temporary files before and after each test."""
-        # Clean up before test
-        temp_dir = tempfile.gettempdir()
-        for file in os.listdir(temp_dir):
-            if file.startswith('tmp') and file.endswith('.sqlite'):
-                try:
-                    os.remove(os.path.join(temp_dir, file))
-                except Exception:
-                    pass
-        
+        """Remove tmp*.sqlite files the server leaves behind if processing fails mid-request."""
         yield
         
-        # Clean up after test
-        temp_dir = tempfile.gettempdir()
-        for file in os.listdir(temp_dir):
-            if file.startswith('tmp') and file.endswith('.sqlite'):
-                try:
-                    os.remove(os.path.join(temp_dir, file))
-                except Exception:
-                    pass
+        # The server deletes its temp database on success, so one sweep after the class is enough
+        with os.scandir(tempfile.gettempdir()) as entries:
+            for entry in entries:
+                if entry.name.startswith('tmp') and entry.name.endswith('.sqlite'):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
     
     @pytest.fixture
-    def temp_db_path(self):
+    def temp_db_path(self, tmp_path):
         """Create a temporary SQLite database for testing."""
-        with tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False) as tmp:
-            db_path = tmp.name
+        db_path = str(tmp_path / "chrome.sqlite")
         
         # Create the database with Chrome-compatible schema
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
+        # Throwaway test DB: skip journaling and fsync
+        cursor.execute('PRAGMA journal_mode=MEMORY')
+        cursor.execute('PRAGMA synchronous=OFF')
         cursor.execute('''
             CREATE TABLE urls (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -97,16 +104,13 @@ class TestTimestampIntegration:
                 hidden INTEGER DEFAULT 0
             )
         ''')
+        # Chrome indexes urls by url; the extractor sorts by last_visit_time
+        cursor.execute('CREATE INDEX urls_url_index ON urls (url)')
+        cursor.execute('CREATE INDEX urls_last_visit_time_index ON urls (last_visit_time)')
         conn.commit()
         conn.close()
         
-        yield db_path
-        
-        # Cleanup
-        try:
-            os.unlink(db_path)
-        except:
-            pass
+        return db_path
     
     @pytest.fixture
     def sample_history_data(self):
@@ -135,26 +139,22 @@ class TestTimestampIntegration:
             }
         ]
     
-    def test_chrome_timestamp_conversion(self):
+    @pytest.mark.parametrize("chrome_timestamp, expected_date", [
+        (1732737600000, "2024-11-27 20:00:00"),  # Recent timestamp
+        (1732910400000, "2024-11-29 20:00:00"),  # Another recent timestamp
+        (1640995200000, "2022-01-01 00:00:00"),  # 2022 timestamp
+    ])
+    def test_chrome_timestamp_conversion(self, chrome_timestamp, expected_date):
         """Test that Chrome timestamps are correctly converted to readable dates."""
-        # Test various Chrome timestamp formats
-        test_cases = [
-            (1732737600000, "2024-11-27 20:00:00"),  # Recent timestamp
-            (1732910400000, "2024-11-29 20:00:00"),  # Another recent timestamp
-            (1640995200000, "2022-01-01 00:00:00"),  # 2022 timestamp
-        ]
+        # Convert using our fixed logic
+        chrome_microseconds = chrome_timestamp * 1000 + CHROME_EPOCH_OFFSET_US
         
-        for chrome_timestamp, expected_date in test_cases:
-            # Convert using our fixed logic
-            unix_milliseconds = chrome_timestamp
-            chrome_microseconds = (unix_milliseconds * 1000) + (11644473600000 * 1000)
-            
-            # Convert to datetime using the history extractor function
-            dt = chrome_time_to_datetime(chrome_microseconds)
-            
-            assert dt is not None
-            assert dt.year > 2000  # Should not be year 1655!
-            assert dt.strftime('%Y-%m-%d %H:%M:%S') == expected_date
+        # Convert to datetime using the history extractor function
+        dt = chrome_time_to_datetime(chrome_microseconds)
+        
+        assert dt is not None
+        assert dt.year > 2000  # Should not be year 1655!
+        assert dt.strftime('%Y-%m-%d %H:%M:%S') == expected_date
     
     def test_server_timestamp_processing(self, client, sample_history_data):
         """Test that the server correctly processes timestamps from browser history."""
@@ -199,49 +199,33 @@ class TestTimestampIntegration:
         for result in data["results"]:
             if result.get("visit_time"):
                 # Should be in format "YYYY-MM-DD HH:MM:SS"
-                assert len(result["visit_time"]) == 19
-                assert result["visit_time"][4] == "-"  # Year-Month separator
-                assert result["visit_time"][7] == "-"  # Month-Day separator
-                assert result["visit_time"][10] == " "  # Date-Time separator
-                assert result["visit_time"][13] == ":"  # Hour-Minute separator
-                assert result["visit_time"][16] == ":"  # Minute-Second separator
+                assert _DISPLAY_TIME_RE.fullmatch(result["visit_time"])
                 
                 # Should not be year 1655
                 year = int(result["visit_time"][:4])
                 assert year > 2000
                 assert year < 2030
     
+    @pytest.mark.parametrize("url, title", [
+        ("https://httpbin.org/test", "Test Page"),
+        ("https://httpbin.org/metadata-test", "Metadata Test"),
+    ])
+    @patch('historyhounder.pipeline.get_embedder', lambda *args, **kwargs: _StubEmbedder())
     @patch('historyhounder.content_fetcher.fetch_and_extract')
-    def test_vector_store_metadata_structure(self, mock_fetch_content, temp_db_path, temp_vector_store_dir):
-        """Test that vector store metadata is structured correctly."""
+    def test_vector_store_metadata_structure(self, mock_fetch_content, temp_db_path, temp_vector_store_dir, url, title):
+        """Test that vector store metadata is structured and mapped correctly for the search API."""
         # Mock content fetching to return valid content
         mock_fetch_content.return_value = {
-            'text': 'This is test content for httpbin',
+            'text': f'Test content for {title}',
             'description': 'Test description',
             'error': None
         }
         
-        # Create a simple test database with one URL
-        conn = sqlite3.connect(temp_db_path)
-        cursor = conn.cursor()
-        
         # Insert test data with Chrome timestamp
         chrome_timestamp = 1732737600000  # 2024-11-27 20:00:00
-        chrome_microseconds = (chrome_timestamp * 1000) + (11644473600000 * 1000)
+        chrome_microseconds = chrome_timestamp * 1000 + CHROME_EPOCH_OFFSET_US
         
-        cursor.execute('''
-            INSERT INTO urls (url, title, visit_count, typed_count, last_visit_time, hidden)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            "https://httpbin.org/test",
-            "Test Page",
-            1,
-            0,
-            chrome_microseconds,
-            0
-        ))
-        conn.commit()
-        conn.close()
+        _populate_urls(temp_db_path, [(url, title, 1, 0, chrome_microseconds, 0)])
         
         # Process through the pipeline
         result = extract_and_process_history(
@@ -259,7 +243,7 @@ class TestTimestampIntegration:
         # Check the vector store metadata
         store = ChromaVectorStore(persist_directory=temp_vector_store_dir)
         try:
-            results = store.collection.get(include=['metadatas'])
+            results = store.collection.get(where={'url': url}, include=['metadatas'])
             assert results['metadatas'] is not None
             
             # Check that metadata has both last_visit_time and visit_time
@@ -268,18 +252,16 @@ class TestTimestampIntegration:
                     assert 'last_visit_time' in metadata
                     assert 'visit_time' in metadata
                     
-                    # Both should be ISO format strings
-                    assert isinstance(metadata['last_visit_time'], str)
+                    # Both should be the same ISO format string
+                    assert metadata['last_visit_time'] == metadata['visit_time']
                     assert isinstance(metadata['visit_time'], str)
-                    assert 'T' in metadata['last_visit_time']
                     assert 'T' in metadata['visit_time']
                     
                     # Should not be year 1655
-                    dt = datetime.fromisoformat(metadata['last_visit_time'].replace('Z', '+00:00'))
+                    dt = datetime.fromisoformat(metadata['last_visit_time'])
                     assert dt.year > 2000
         finally:
             store.close()
-            # Test database cleanup is handled by the temp_vector_store_dir fixture
     
     def test_incremental_processing(self, client, sample_history_data):
         """Test that incremental processing works correctly."""
@@ -339,77 +321,8 @@ class TestTimestampIntegration:
             "no new history items"
         ]) or third_data["processed_count"] == 0
     
-    @patch('historyhounder.content_fetcher.fetch_and_extract')
-    def test_metadata_field_mapping(self, mock_fetch_content, temp_db_path, temp_vector_store_dir):
-        """Test that metadata fields are properly mapped for search API."""
-        # Mock content fetching
-        mock_fetch_content.return_value = {
-            'text': 'Test content for metadata mapping',
-            'description': 'Test description',
-            'error': None
-        }
-        
-        # Create test database
-        conn = sqlite3.connect(temp_db_path)
-        cursor = conn.cursor()
-        
-        chrome_timestamp = 1732737600000
-        chrome_microseconds = (chrome_timestamp * 1000) + (11644473600000 * 1000)
-        
-        cursor.execute('''
-            INSERT INTO urls (url, title, visit_count, typed_count, last_visit_time, hidden)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            "https://httpbin.org/metadata-test",
-            "Metadata Test",
-            1,
-            0,
-            chrome_microseconds,
-            0
-        ))
-        conn.commit()
-        conn.close()
-        
-        # Process through pipeline
-        result = extract_and_process_history(
-            browser='chrome',
-            db_path=temp_db_path,
-            with_content=True,
-            embed=True,
-            embedder_backend='sentence-transformers',
-            persist_directory=temp_vector_store_dir
-        )
-        
-        assert result['status'] == 'embedded'
-        
-        # Check vector store metadata
-        store = ChromaVectorStore(persist_directory=temp_vector_store_dir)
-        try:
-            results = store.collection.get(include=['metadatas'])
-            
-            for metadata in results['metadatas']:
-                if isinstance(metadata, dict):
-                    # Should have both fields
-                    assert 'last_visit_time' in metadata
-                    assert 'visit_time' in metadata
-                    
-                    # Both should have the same value
-                    assert metadata['last_visit_time'] == metadata['visit_time']
-                    
-                    # Should be ISO format
-                    assert isinstance(metadata['visit_time'], str)
-                    assert 'T' in metadata['visit_time']
-        finally:
-            store.close()
-            # Clean up
-            import shutil
-            if os.path.exists('test_metadata_db'):
-                shutil.rmtree('test_metadata_db')
-    
     def test_sqlite_database_creation(self, isolated_client, sample_history_data):
         """Test that SQLite databases are created correctly with proper schema."""
-        import os
-        
         # Process history data using isolated client
         response = isolated_client.post(
             "/api/process-history",
@@ -12,10 +12,13 @@ class DummyCollection:
         return {'documents': [['doc1']], 'metadatas': [[{'url': 'u'}]], 'distances': [[0.1]]}
 
 class DummyClient:
+    max_batch_size = 100
     def __init__(self, *a, **kw):
         self.collection = DummyCollection()
     def get_or_create_collection(self, name):
         return self.collection
+    def get_max_batch_size(self):
+        return self.max_batch_size
 
 
 def test_add_and_query(monkeypatch):
@@ -32,6 +35,17 @@ def test_add_and_query(monkeypatch):
     assert 'distances' in result 
 
 
+def test_add_splits_into_client_batches(monkeypatch):
+    monkeypatch.setattr('chromadb.PersistentClient', DummyClient)
+    monkeypatch.setattr(DummyClient, 'max_batch_size', 2)
+    store = ChromaVectorStore(persist_directory=':memory:')
+    docs = ['doc1', 'doc2', 'doc3', 'doc4', 'doc5']
+    embs = [[float(i), 0.0] for i in range(5)]
+    metas = [{'url': f'u{i}'} for i in range(5)]
+    store.add(docs, embs, metas)
+    assert [batch[3] for batch in store.collection.added] == [['u0', 'u1'], ['u2', 'u3'], ['u4']]
+
+
 def test_query_no_results(monkeypatch):
     class EmptyCollection:
         def add(self, documents, embeddings, metadatas, ids):
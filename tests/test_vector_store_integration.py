@@ -5,10 +5,7 @@ Covers the vector store metadata and pipeline issues we encountered.
 """
 
 import pytest
-import tempfile
-import os
 import sqlite3
-import shutil
 from datetime import datetime
 from unittest.mock import patch
 
@@ -17,47 +14,52 @@ from historyhounder.pipeline import extract_and_process_history
 from historyhounder.utils import convert_metadata_for_chroma
 
 
+# Microseconds from the Chrome epoch (1601-01-01) to the Unix epoch
+CHROME_EPOCH_OFFSET_US = 11_644_473_600_000_000
+
+
+def create_chrome_history_db_with_urls(db_path, url_title_time_tuples):
+    conn = sqlite3.connect(db_path)
+    # Throwaway test DB: skip journaling and fsync
+    conn.execute('PRAGMA journal_mode=MEMORY')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    c = conn.cursor()
+    c.execute('''CREATE TABLE urls (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT,
+        title TEXT,
+        visit_count INTEGER,
+        typed_count INTEGER,
+        last_visit_time INTEGER,
+        hidden INTEGER DEFAULT 0
+    )''')
+    c.executemany('INSERT INTO urls (url, title, visit_count, typed_count, last_visit_time, hidden) VALUES (?, ?, 1, 0, ?, 0)', url_title_time_tuples)
+    conn.commit()
+    conn.close()
+
+
+class _StubEmbedder:
+    """Fixed-vector embedder for tests that only check metadata, so no model is loaded."""
+
+    def embed(self, texts):
+        return [[0.0] * 8 for _ in texts]
+
+
 class TestVectorStoreIntegration:
     """Integration tests for vector store operations and pipeline issues."""
     
-    @pytest.fixture(autouse=True)
-    def cleanup_vector_store(self):
-        """Clean up the vector store before and after each test."""
-        # This fixture is no longer needed since tests use isolated temp directories
-        # The temp_persist_dir fixture handles cleanup for each test
-        yield
-    
-    @pytest.fixture(autouse=True)
-    def cleanup_temp_files(self):
-        """Clean up temporary files before and after each test."""
-        # Clean up before test
-        temp_dir = tempfile.gettempdir()
-        for file in os.listdir(temp_dir):
-            if file.startswith('tmp') and file.endswith('.sqlite'):
-                try:
-                    os.remove(os.path.join(temp_dir, file))
-                except Exception:
-                    pass
-        
-        yield
-        
-        # Clean up after test
-        temp_dir = tempfile.gettempdir()
-        for file in os.listdir(temp_dir):
-            if file.startswith('tmp') and file.endswith('.sqlite'):
-                try:
-                    os.remove(os.path.join(temp_dir, file))
-                except Exception:
-                    pass
+    @pytest.fixture(scope="class")
+    def vector_store(self, tmp_path_factory):
+        """One ChromaVectorStore for the class; tests clear it before adding their data."""
+        store = ChromaVectorStore(persist_directory=str(tmp_path_factory.mktemp("test_chroma_")))
+        yield store
+        store.close()
     
     @pytest.fixture
-    def temp_persist_dir(self):
-        """Create a temporary directory for vector store testing."""
-        temp_dir = tempfile.mkdtemp(prefix='test_chroma_')
-        yield temp_dir
-        # Cleanup
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+    def temp_persist_dir(self, temp_vector_store_dir):
+        """Temporary vector store directory, on tmpfs where available so Chroma's fsyncs are cheap."""
+        return temp_vector_store_dir
     
     @pytest.fixture
     def sample_metadata(self):
@@ -95,13 +97,13 @@ class TestVectorStoreIntegration:
         # The conversion might keep None or convert to empty string, both are valid
         assert converted_with_none['title'] in [None, ""]
     
-    def test_vector_store_add_and_query(self, temp_persist_dir):
+    def test_vector_store_add_and_query(self, vector_store):
         """Test basic vector store add and query operations."""
-        store = ChromaVectorStore(persist_directory=temp_persist_dir)
+        vector_store.clear()
         
         # Test data
         docs = ["This is a test document about httpbin"]
-        embeddings = [[0.1, 0.2, 0.3, 0.4, 0.5] * 76]  # 384 dimensions
+        embeddings = [([0.1, 0.2, 0.3, 0.4, 0.5] * 77)[:384]]  # 384 dimensions
         metadatas = [{
             'url': 'https://httpbin.org/test',
             'title': 'Test Page',
@@ -111,11 +113,11 @@ class TestVectorStoreIntegration:
         }]
         
         # Add documents
-        store.add(docs, embeddings, metadatas)
+        vector_store.add(docs, embeddings, metadatas)
         
         # Query documents
-        query_embedding = [0.1, 0.2, 0.3, 0.4, 0.5] * 76
-        results = store.query(query_embedding, top_k=1)
+        query_embedding = ([0.1, 0.2, 0.3, 0.4, 0.5] * 77)[:384]
+        results = vector_store.query(query_embedding, top_k=1)
         
         assert len(results['documents'][0]) > 0
         assert len(results['metadatas'][0]) > 0
@@ -127,12 +129,10 @@ class TestVectorStoreIntegration:
         assert 'title' in metadata
         assert 'last_visit_time' in metadata
         assert 'visit_time' in metadata
-        
-        store.close()
     
-    def test_vector_store_duplicate_handling(self, temp_persist_dir):
+    def test_vector_store_duplicate_handling(self, vector_store):
         """Test that vector store handles duplicate URLs correctly."""
-        store = ChromaVectorStore(persist_directory=temp_persist_dir)
+        vector_store.clear()
         
         # Add document with URL
         docs = ["First document"]
@@ -144,7 +144,7 @@ class TestVectorStoreIntegration:
             'visit_time': '2024-11-27T20:00:00'
         }]
         
-        store.add(docs, embeddings, metadatas)
+        vector_store.add(docs, embeddings, metadatas)
         
         # Add same URL with different content
         docs2 = ["Second document"]
@@ -157,136 +157,100 @@ class TestVectorStoreIntegration:
         }]
         
         # Should not crash, should handle duplicates
-        store.add(docs2, embeddings2, metadatas2)
-        
-        # Check count
-        count = store.count()
-        assert count > 0
+        vector_store.add(docs2, embeddings2, metadatas2)
         
-        store.close()
+        # The second add replaces the first entry for the URL
+        assert vector_store.count() == 1
+        stored = vector_store.collection.get(ids=['https://httpbin.org/duplicate'], include=['documents', 'metadatas'])
+        assert stored['documents'] == ["Second document"]
+        assert stored['metadatas'][0]['title'] == 'Second Title'
     
-    @patch('historyhounder.content_fetcher.fetch_and_extract')
-    def test_pipeline_metadata_mapping(self, mock_fetch_content, temp_persist_dir):
+    @patch('historyhounder.pipeline.get_embedder', lambda *args, **kwargs: _StubEmbedder())
+    def test_pipeline_metadata_mapping(self, monkeypatch, temp_persist_dir, tmp_path):
         """Test that pipeline correctly maps metadata fields."""
         # Mock content fetching
-        mock_fetch_content.return_value = {
-            'text': 'Test content for metadata mapping',
-            'description': 'Test description',
-            'error': None
-        }
+        def mock_fetch_and_extract(url):
+            return {
+                'text': 'Test content for metadata mapping',
+                'description': 'Test description',
+                'error': None
+            }
         
-        # Create a temporary database
-        with tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False) as tmp:
-            db_path = tmp.name
+        monkeypatch.setattr('historyhounder.content_fetcher.fetch_and_extract', mock_fetch_and_extract)
         
-        try:
-            # Create database with test data
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE urls (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    url TEXT,
-                    title TEXT,
-                    visit_count INTEGER,
-                    typed_count INTEGER,
-                    last_visit_time INTEGER,
-                    hidden INTEGER DEFAULT 0
-                )
-            ''')
-            
-            # Insert test data
-            chrome_timestamp = 1732737600000  # 2024-11-27 20:00:00
-            chrome_microseconds = (chrome_timestamp * 1000) + (11644473600000 * 1000)
-            
-            cursor.execute('''
-                INSERT INTO urls (url, title, visit_count, typed_count, last_visit_time, hidden)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                "https://httpbin.org/pipeline-test",
-                "Pipeline Test",
-                1,
-                0,
-                chrome_microseconds,
-                0
-            ))
-            conn.commit()
-            conn.close()
-            
-            # Process through pipeline
-            result = extract_and_process_history(
-                browser='chrome',
-                db_path=db_path,
-                with_content=True,  # Enable content fetching
-                embed=True,
-                embedder_backend='sentence-transformers',
-                persist_directory=temp_persist_dir
-            )
+        # Create a temporary database
+        db_path = str(tmp_path / "chrome.sqlite")
+        
+        # Insert test data
+        chrome_timestamp = 1732737600000  # 2024-11-27 20:00:00
+        chrome_microseconds = chrome_timestamp * 1000 + CHROME_EPOCH_OFFSET_US
+        create_chrome_history_db_with_urls(db_path, [("https://httpbin.org/pipeline-test", "Pipeline Test", chrome_microseconds)])
+        
+        # Process through pipeline
+        result = extract_and_process_history(
+            browser='chrome',
+            db_path=db_path,
+            with_content=True,  # Enable content fetching
+            embed=True,
+            embedder_backend='sentence-transformers',
+            persist_directory=temp_persist_dir
+        )
+        
+        assert result['status'] == 'embedded'
+        assert len(result['results']) > 0
+        
+        # Check that results have last_visit_time (from history extractor)
+        for item in result['results']:
+            assert 'last_visit_time' in item
             
-            assert result['status'] == 'embedded'
-            assert len(result['results']) > 0
+            # Should be datetime objects
+            assert isinstance(item['last_visit_time'], datetime)
             
-            # Check that results have last_visit_time (from history extractor)
-            for item in result['results']:
-                assert 'last_visit_time' in item
-                
-                # Should be datetime objects
-                assert isinstance(item['last_visit_time'], datetime)
-                
-                # Should not be year 1655
-                assert item['last_visit_time'].year > 2000
+            # Should not be year 1655
+            assert item['last_visit_time'].year > 2000
+        
+        # Check that vector store metadata has both fields
+        store = ChromaVectorStore(persist_directory=temp_persist_dir)
+        try:
+            results = store.collection.get(include=['metadatas'])
             
-            # Check that vector store metadata has both fields
-            store = ChromaVectorStore(persist_directory=temp_persist_dir)
-            try:
-                results = store.collection.get(include=['metadatas'])
-                
-                for metadata in results['metadatas']:
-                    if isinstance(metadata, dict):
-                        # Should have both fields in the stored metadata
-                        assert 'last_visit_time' in metadata
-                        assert 'visit_time' in metadata
-                        
-                        # Both should have the same value
-                        assert metadata['last_visit_time'] == metadata['visit_time']
-                        
-                        # Should be ISO format
-                        assert isinstance(metadata['visit_time'], str)
-                        assert 'T' in metadata['visit_time']
-            finally:
-                store.close()
-                
+            for metadata in results['metadatas']:
+                if isinstance(metadata, dict):
+                    # Should have both fields in the stored metadata
+                    assert 'last_visit_time' in metadata
+                    assert 'visit_time' in metadata
+                    
+                    # Both should have the same value
+                    assert metadata['last_visit_time'] == metadata['visit_time']
+                    
+                    # Should be ISO format
+                    assert isinstance(metadata['visit_time'], str)
+                    assert 'T' in metadata['visit_time']
         finally:
-            # Cleanup
-            try:
-                os.unlink(db_path)
-            except:
-                pass
+            store.close()
     
-    def test_vector_store_clear_operation(self, temp_persist_dir):
+    def test_vector_store_clear_operation(self, vector_store):
         """Test that vector store clear operation works correctly."""
-        store = ChromaVectorStore(persist_directory=temp_persist_dir)
+        vector_store.clear()
         
         # Add some documents
         docs = ["Test document"]
         embeddings = [[0.1] * 384]
         metadatas = [{'url': 'https://test.com', 'title': 'Test'}]
         
-        store.add(docs, embeddings, metadatas)
-        assert store.count() > 0
+        vector_store.add(docs, embeddings, metadatas)
+        assert vector_store.count() > 0
         
         # Clear the store
-        store.clear()
-        assert store.count() == 0
-        
-        store.close()
+        vector_store.clear()
+        assert vector_store.count() == 0
     
-    def test_vector_store_count_operation(self, temp_persist_dir):
+    def test_vector_store_count_operation(self, vector_store):
         """Test that vector store count operation works correctly."""
-        store = ChromaVectorStore(persist_directory=temp_persist_dir)
+        vector_store.clear()
         
         # Initially should be empty
-        assert store.count() == 0
+        assert vector_store.count() == 0
         
         # Add documents
         docs = ["Doc 1", "Doc 2", "Doc 3"]
@@ -297,97 +261,61 @@ class TestVectorStoreIntegration:
             {'url': 'https://test3.com', 'title': 'Test 3'}
         ]
         
-        store.add(docs, embeddings, metadatas)
-        assert store.count() == 3
-        
-        store.close()
+        vector_store.add(docs, embeddings, metadatas)
+        assert vector_store.count() == 3
     
-    @patch('historyhounder.content_fetcher.fetch_and_extract')
-    def test_pipeline_incremental_processing(self, mock_fetch_content, temp_persist_dir):
+    @patch('historyhounder.pipeline.get_embedder', lambda *args, **kwargs: _StubEmbedder())
+    def test_pipeline_incremental_processing(self, monkeypatch, temp_persist_dir, tmp_path):
         """Test that pipeline handles incremental processing correctly."""
         # Mock content fetching
-        mock_fetch_content.return_value = {
-            'text': 'Test content for incremental processing',
-            'description': 'Test description',
-            'error': None
-        }
+        def mock_fetch_and_extract(url):
+            return {
+                'text': 'Test content for incremental processing',
+                'description': 'Test description',
+                'error': None
+            }
         
-        # Create test database
-        with tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False) as tmp:
-            db_path = tmp.name
+        monkeypatch.setattr('historyhounder.content_fetcher.fetch_and_extract', mock_fetch_and_extract)
         
-        try:
-            # Create database
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE urls (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    url TEXT,
-                    title TEXT,
-                    visit_count INTEGER,
-                    typed_count INTEGER,
-                    last_visit_time INTEGER,
-                    hidden INTEGER DEFAULT 0
-                )
-            ''')
-            
-            # Insert initial data
-            chrome_timestamp = 1732737600000
-            chrome_microseconds = (chrome_timestamp * 1000) + (11644473600000 * 1000)
-            
-            cursor.execute('''
-                INSERT INTO urls (url, title, visit_count, typed_count, last_visit_time, hidden)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                "https://httpbin.org/initial",
-                "Initial Page",
-                1,
-                0,
-                chrome_microseconds,
-                0
-            ))
-            conn.commit()
-            conn.close()
-            
-            # First processing
-            result1 = extract_and_process_history(
-                browser='chrome',
-                db_path=db_path,
-                with_content=True,
-                embed=True,
-                embedder_backend='sentence-transformers',
-                persist_directory=temp_persist_dir
-            )
-            
-            assert result1['status'] == 'embedded'
-            initial_count = len(result1['results'])
-            
-            # Second processing with same data (should be incremental)
-            result2 = extract_and_process_history(
-                browser='chrome',
-                db_path=db_path,
-                with_content=True,
-                embed=True,
-                embedder_backend='sentence-transformers',
-                persist_directory=temp_persist_dir,
-                existing_urls={'https://httpbin.org/initial'}  # Mark as existing
-            )
-            
-            # Should indicate no new documents
-            assert result2['status'] == 'no_new_documents'
-            assert len(result2['results']) == 0
-            
-        finally:
-            # Cleanup
-            try:
-                os.unlink(db_path)
-            except:
-                pass
+        # Create test database
+        db_path = str(tmp_path / "chrome.sqlite")
+        
+        # Insert initial data
+        chrome_timestamp = 1732737600000
+        chrome_microseconds = chrome_timestamp * 1000 + CHROME_EPOCH_OFFSET_US
+        create_chrome_history_db_with_urls(db_path, [("https://httpbin.org/initial", "Initial Page", chrome_microseconds)])
+        
+        # First processing
+        result1 = extract_and_process_history(
+            browser='chrome',
+            db_path=db_path,
+            with_content=True,
+            embed=True,
+            embedder_backend='sentence-transformers',
+            persist_directory=temp_persist_dir
+        )
+        
+        assert result1['status'] == 'embedded'
+        initial_count = len(result1['results'])
+        
+        # Second processing with same data (should be incremental)
+        result2 = extract_and_process_history(
+            browser='chrome',
+            db_path=db_path,
+            with_content=True,
+            embed=True,
+            embedder_backend='sentence-transformers',
+            persist_directory=temp_persist_dir,
+            existing_urls={'https://httpbin.org/initial'}  # Mark as existing
+        )
+        
+        # Should indicate no new documents
+        assert result2['status'] == 'no_new_documents'
+        assert len(result2['results']) == 0
     
-    def test_vector_store_metadata_structure_complexity(self, temp_persist_dir):
+    def test_vector_store_metadata_structure_complexity(self, vector_store):
         """Test handling of complex metadata structures like we encountered."""
-        store = ChromaVectorStore(persist_directory=temp_persist_dir)
+        vector_store.clear()
         
         # Test with shared metadata structure (like we saw in the logs)
         docs = ["Document 1", "Document 2"]
@@ -409,11 +337,11 @@ class TestVectorStoreIntegration:
         ]
         
         # Should handle this correctly
-        store.add(docs, embeddings, metadatas)
+        vector_store.add(docs, embeddings, metadatas)
         
         # Query to verify
         query_embedding = [0.1] * 384
-        results = store.query(query_embedding, top_k=2)
+        results = vector_store.query(query_embedding, top_k=2)
         
         assert len(results['metadatas'][0]) > 0
         
@@ -424,7 +352,6 @@ class TestVectorStoreIntegration:
             assert 'last_visit_time' in metadata
             assert 'visit_time' in metadata
         
-        store.close()
 
 
 if __name__ == "__main__":